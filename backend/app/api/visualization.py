@@ -1,5 +1,8 @@
 """可视化数据 API"""
+import json
+
 from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from ..schemas import (
     ERPRequest, ERPData,
@@ -12,8 +15,23 @@ from ..services.eeg_service import eeg_service
 from ..services.tfr_jobs import tfr_job_manager
 from .deps import get_session_or_404
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时回退到标准库 json
+    orjson = None
+
 router = APIRouter(prefix="/visualization", tags=["可视化"])
 
+
+def _json_response(payload: dict) -> Response:
+    """直接序列化服务层已构造好的响应字典，跳过 response_model 的逐字段校验与转换"""
+    if orjson is not None:
+        return Response(
+            orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+            media_type="application/json"
+        )
+    return JSONResponse(payload)
+
 @router.post("/erp", response_model=ERPData)
 async def get_erp_data(request: ERPRequest):
     """获取 ERP 数据"""
@@ -95,13 +113,46 @@ async def get_topomap_animation(request: TopoAnimationRequest):
             request.contours,
             request.sensors
         )
-        return animation
+        # 动画帧数多、体积大，跳过逐帧的 Pydantic 校验直接序列化
+        return _json_response(animation)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取动画数据失败: {str(e)}")
 
 
+@router.post("/topomap/animation/stream")
+async def stream_topomap_animation(request: TopoAnimationRequest):
+    """流式获取 MNE 风格地形图动画帧（NDJSON：首行为动画元数据，其后每行一帧）"""
+    session = get_session_or_404(request.session_id)
+    if request.render_mode != "image":
+        raise HTTPException(status_code=400, detail="流式动画接口仅支持 image 渲染模式")
+    try:
+        header, frames = eeg_service.stream_topomap_animation_images(
+            session,
+            request.start_time,
+            request.end_time,
+            request.frame_interval,
+            request.contours,
+            request.sensors
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取动画数据失败: {str(e)}")
+
+    def ndjson_lines():
+        yield json.dumps(header) + "\n"
+        try:
+            for frame in frames:
+                yield json.dumps(frame) + "\n"
+        except Exception as e:
+            # 响应头已发出，只能以错误行通知前端
+            yield json.dumps({"error": f"渲染动画帧失败: {str(e)}"}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @router.post("/tfr/start", response_model=TFRStartResponse)
 async def start_tfr_job(request: TFRRequest, background_tasks: BackgroundTasks):
     """提交 TFR 后台任务（Morlet，支持 Canvas/MNE 双渲染模式）"""
@@ -124,6 +175,8 @@ async def start_tfr_job(request: TFRRequest, background_tasks: BackgroundTasks):
             request.colormap,     # 新增：colormap
             request.vmin,         # 新增：vmin
             request.vmax,         # 新增：vmax
+            request.binary,
+            request.per_channel_images,
         )
         return TFRStartResponse(job_id=job_id)
     except ValueError as e:
@@ -133,18 +186,22 @@ async def start_tfr_job(request: TFRRequest, background_tasks: BackgroundTasks):
 
 
 @router.get("/tfr/{job_id}", response_model=TFRJobResponse)
-async def get_tfr_job(job_id: str):
-    """查询 TFR 任务状态/结果"""
+def get_tfr_job(job_id: str):
+    """查询 TFR 任务状态/结果
+
+    结果可达数 MB：使用同步函数让 FastAPI 在线程池中完成序列化，不阻塞事件循环；
+    结果已在任务线程中按 TFRResult 校验过，这里直接序列化。
+    """
     job = tfr_job_manager.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="任务不存在")
-    return TFRJobResponse(
-        job_id=job.job_id,
-        status=job.status,
-        progress=job.progress,
-        error=job.error,
-        result=job.result,
-    )
+    return _json_response({
+        "job_id": job.job_id,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+        "result": job.result,
+    })
 
 
 @router.post("/tfr/{job_id}/cancel")
@@ -1,5 +1,6 @@
 """波形数据 API"""
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 
 from ..schemas import WaveformRequest, WaveformResponse
 from ..services.eeg_service import eeg_service
@@ -25,3 +26,20 @@ async def get_waveform(request: WaveformRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取波形失败: {str(e)}")
 
+@router.post("/get-binary", response_class=Response)
+async def get_waveform_binary(request: WaveformRequest):
+    """获取波形数据（二进制帧：JSON 头 + float32 采样矩阵，供前端免解析读取）"""
+    session = get_session_or_404(request.session_id)
+    
+    try:
+        content = eeg_service.get_waveform_binary(
+            session,
+            start_time=request.start_time,
+            duration=request.duration,
+            target_sfreq=request.target_sample_rate
+        )
+        return Response(content=content, media_type="application/octet-stream")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取波形失败: {str(e)}")
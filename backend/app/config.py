@@ -47,10 +47,18 @@ class Settings(BaseSettings):
     DEFAULT_SAMPLE_RATE: int = 250
     WAVEFORM_CHUNK_DURATION: float = 10.0
     MAX_CHANNELS_DISPLAY: int = 64
-    TFR_N_JOBS: int = 1
+    TFR_N_JOBS: int = -1  # TFR 的 FFT 线程数（<=0 表示使用全部核心）
+    TFR_USE_CUDA: bool = False  # 安装 cupy 且有 CUDA 设备时，TFR 卷积改在 GPU 上计算
+    TFR_CACHE_MAX_BYTES: int = 256 * 1024 ** 2  # 每个会话 TFR 通道功率缓存上限（<=0 表示不缓存）
+    TFR_JOB_TTL_SECONDS: int = 600  # TFR 任务（含结果）在最后一次更新后保留的秒数
+    TFR_JOB_MAX: int = 32  # 最多保留的 TFR 任务数，超出时淘汰最早的已结束任务
+    TFR_RENDER_WORKERS: int = 1  # TFR 每通道图像渲染线程数（1 为串行，<=0 表示按核心数，最多 8）
+    FILTER_N_JOBS: int = 1  # 滤波并行进程数（打包环境强制为 1）
+    TOPOMAP_RENDER_WORKERS: int = 1  # 地形图动画图片帧并行渲染进程数（打包环境强制为 1）
     MAX_UPLOAD_SIZE_MB: int = 100
     SUPPORTED_UPLOAD_EXTENSIONS: list[str] = [".edf", ".bdf", ".gdf", ".set", ".fif"]
     MAX_UNDO_STACK: int = 10
+    MAX_UNDO_BYTES: int = 2 * 1024 ** 3  # 撤销栈数据数组总字节上限（<=0 表示只按条数限制）
     ENABLE_ICLABEL: bool = True
     ICA_FIT_MAX_SFREQ: float = 250.0
     ICA_FIT_MAX_DURATION_SECONDS: Optional[float] = None
@@ -78,9 +78,8 @@ class WaveformRequest(BaseModel):
     target_sample_rate: int = 250  # 降采样率
 
 class WaveformChannel(BaseModel):
-    """单通道波形数据"""
+    """单通道波形元数据（采样值统一放在 WaveformResponse.data_b64 中）"""
     name: str
-    data: list[float]
     is_bad: bool
 
 class WaveformEvent(BaseModel):
@@ -94,6 +93,9 @@ class WaveformResponse(BaseModel):
     time_range: tuple[float, float]
     sample_rate: int
     channels: list[WaveformChannel]
+    data_b64: str = ""  # (n_channels, n_samples) 小端 float32 矩阵的 base64 编码，行顺序与 channels 一致
+    dtype: Literal["float32"] = "float32"
+    shape: tuple[int, int] = (0, 0)  # (n_channels, n_samples)
     events: list[WaveformEvent] = []
     is_epoch: bool = False  # 是否为epoch模式
     n_epochs: Optional[int] = None  # epoch模式下，epoch总数
@@ -257,6 +259,8 @@ class TFRRequest(BaseModel):
     colormap: str = "RdBu_r"  # MNE colormap
     vmin: Optional[float] = None  # 颜色映射最小值（自动计算则为None）
     vmax: Optional[float] = None  # 颜色映射最大值（自动计算则为None）
+    binary: bool = Field(False, description="为 True 时 power_by_channel 以 base64 二进制返回（有基线校正时为 float16，否则 float32），避免超大嵌套 JSON 列表")
+    per_channel_images: bool = Field(True, description="image 模式下是否渲染每通道图像；只需要 ROI 平均图时设为 False 以跳过")
 
 
 class TFRStartResponse(BaseModel):
@@ -269,6 +273,9 @@ class TFRResult(BaseModel):
     power: list[list[float]]  # [freq][time] (channels avg)
     channel_names: list[str] = []  # picks后的通道名（用于多通道小窗显示）
     power_by_channel: list[list[list[float]]] = []  # [ch][freq][time]
+    power_by_channel_b64: Optional[str] = None  # binary 模式：小端浮点数组的 base64
+    power_by_channel_shape: Optional[list[int]] = None  # binary 模式：[ch, freq, time]
+    power_by_channel_dtype: Optional[Literal["float16", "float32"]] = None  # binary 模式的元素类型
     # 新增：MNE 渲染输出
     image_base64: Optional[str] = None  # MNE渲染的PNG图像（base64编码）
     images_by_channel: Optional[dict[str, str]] = None  # 每通道MNE图像 {ch_name: base64}
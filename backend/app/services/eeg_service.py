@@ -1,11 +1,23 @@
 """EEG 数据处理服务 - 封装 MNE-Python 操作"""
+import io
 import os
+import sys
+import struct
 import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice, repeat
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 import numpy as np
 import mne
 from mne.preprocessing import ICA
+from PIL import Image
+
+try:
+    import pybase64 as base64
+except ImportError:  # pybase64 为可选依赖（SIMD 加速 base64 编解码，接口与标准库一致），未安装时回退到标准库
+    import base64
 
 from ..config import settings
 from ..schemas import (
@@ -18,6 +30,311 @@ from .session_manager import session_manager, EEGSession
 # 抑制 MNE 的日志输出
 mne.set_log_level('WARNING')
 
+IS_FROZEN = getattr(sys, 'frozen', False)
+
+# epoch 之间的分隔标记值（远小于正常 EEG 数据范围，前端据此识别 epoch 边界）
+EPOCH_SEPARATOR_VALUE = -1e10
+
+
+def _assemble_epoch_channels(
+    selected_epochs: np.ndarray,
+    picks: np.ndarray,
+    factor: int,
+    sep_value: float,
+    scale: float
+) -> np.ndarray:
+    """将多个 epoch 按通道拼接为一个矩阵
+
+    一次完成通道选择、降采样和单位换算，epoch 之间插入分隔标记值。
+
+    Args:
+        selected_epochs: (n_epochs, n_channels, n_times) 的 epoch 数据
+        picks: 要输出的通道索引
+        factor: 降采样步长
+        sep_value: 分隔标记值
+        scale: 单位换算系数
+
+    Returns:
+        (n_picks, n_epochs * (n_samples + 1) - 1) 的 float32 矩阵
+    """
+    segments = selected_epochs[:, picks, ::factor]
+    n_epochs, n_channels, n_samples = segments.shape
+    assembled = np.full((n_channels, n_epochs, n_samples + 1), sep_value, dtype=np.float32)
+    # 单位换算直接写入输出缓冲区，避免额外的 float64 临时数组
+    np.multiply(
+        segments.transpose(1, 0, 2), scale,
+        out=assembled[:, :, :n_samples], casting='unsafe'
+    )
+    # 去掉最后一个 epoch 之后多余的分隔标记
+    return assembled.reshape(n_channels, -1)[:, :-1]
+
+
+@lru_cache(maxsize=32)
+def _load_standard_montage(name: str) -> mne.channels.DigMontage:
+    """加载标准电极模板（按名称缓存，避免每次请求重复解析 MNE 模板文件）
+
+    返回的对象在各会话间共享，只能只读使用；set_montage 内部会复制，不会修改它。
+    """
+    return mne.channels.make_standard_montage(name)
+
+
+def _try_load_montage(name: str) -> Optional[dict]:
+    """加载单个标准模板并返回概要信息，无法加载时返回 None"""
+    try:
+        montage = _load_standard_montage(name)
+    except Exception:
+        return None
+    return {
+        "name": name,
+        "channel_count": len(montage.ch_names),
+        "sample_channels": montage.ch_names[:5]
+    }
+
+
+@lru_cache(maxsize=1)
+def _available_montages() -> tuple[dict, ...]:
+    """加载全部可选标准模板的概要信息（整表缓存，只在首次调用时用线程池并行加载）"""
+    standard_montages = [
+        "standard_1020",
+        "standard_1005",
+        "standard_alphabetic",
+        "standard_prefixed",
+        "standard_postfixed",
+        "biosemi16",
+        "biosemi32",
+        "biosemi64",
+        "easycap-M1",
+        "easycap-M10"
+    ]
+
+    # 模板加载以文件读取/解析为主，用线程并行加载（map 保持原有顺序）
+    with ThreadPoolExecutor(max_workers=min(8, len(standard_montages))) as executor:
+        results = list(executor.map(_try_load_montage, standard_montages))
+
+    # 跳过无法加载的蒙特卡
+    return tuple(info for info in results if info is not None)
+
+
+def _as_float32_matrix(matrix: np.ndarray) -> np.ndarray:
+    """转换为行优先的小端 float32 矩阵，前端用 Float32Array 直接读取"""
+    return np.ascontiguousarray(matrix, dtype='<f4')
+
+
+def _channel_locations(info: mne.Info) -> np.ndarray:
+    """一次性提取所有通道的 3D 坐标，返回 (n_channels, 3) 矩阵（缺失位置记为 0）"""
+    chs = info['chs']
+    locs = np.zeros((len(chs), 3))
+    for idx, ch in enumerate(chs):
+        loc = ch['loc']
+        if loc is not None and len(loc) >= 3:
+            locs[idx] = loc[:3]
+    return locs
+
+
+def _normalize_topomap_positions(
+    ch_names: list[str],
+    locs: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """将电极 3D 坐标归一化到单位球面并投影为地形图平面坐标
+
+    位置无效的 A1/A2 放到左右耳位置（标准 10-20 系统），其余无效位置
+    以及下半球电极（z < -0.5）被跳过。
+
+    Returns:
+        (有效电极的 (n_valid, 2) 平面坐标, 有效电极在 ch_names 中的索引, 有效通道名)
+    """
+    coords = np.array(locs, dtype=np.float64)
+    # 先用半径平方做筛选，只对保留下来的电极开方
+    radius_sq = np.sum(coords ** 2, axis=1)
+
+    # A1/A2 位置修正：如果位置无效，手动设置到耳朵位置（A1 在左耳，A2 在右耳）
+    names_upper = np.array([name.upper() for name in ch_names])
+    missing = radius_sq < 0.01 ** 2
+    coords[missing & (names_upper == 'A1')] = (-0.5, 0.0, 0.0)
+    coords[missing & (names_upper == 'A2')] = (0.5, 0.0, 0.0)
+    radius_sq = np.sum(coords ** 2, axis=1)
+
+    # 跳过其他无效位置；只显示上半球和侧面电极（z/r > -0.5，允许A1/A2等耳部电极）
+    # z/r < -0.5 等价于 z < 0 且 4z² > r²，无需先归一化
+    z = coords[:, 2]
+    lower = (z < 0) & (4 * z * z > radius_sq)
+    valid_idx = np.flatnonzero(~(radius_sq < 0.01 ** 2) & ~lower)
+
+    # 归一化到单位球面后取平面坐标
+    pos_array = coords[valid_idx, :2] / np.sqrt(radius_sq[valid_idx, None])
+    return pos_array, valid_idx, [ch_names[idx] for idx in valid_idx]
+
+
+def _nearest_time_indices(times: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """在升序时间轴上批量查找最接近各目标时间的采样索引
+
+    用二分查找代替逐个 argmin(abs(times - t))；等距时取较早的采样，与 argmin 结果一致。
+    """
+    targets = np.atleast_1d(np.asarray(targets, dtype=np.float64))
+    if len(times) == 1:
+        return np.zeros(len(targets), dtype=np.intp)
+    idx = np.clip(np.searchsorted(times, targets), 1, len(times) - 1)
+    idx -= (targets - times[idx - 1]) <= (times[idx] - targets)
+    return idx
+
+
+def _encode_figure_png(fig, pad_px: int = 10) -> str:
+    """将已创建的 Figure 快速编码为 PNG 的 base64 字符串
+
+    直接读取 Agg 画布像素，按非白色内容裁掉四周留白（等效 bbox_inches='tight'，
+    但不需要 savefig 再完整绘制一遍），并用 Pillow 以压缩等级 4 编码：
+    比等级 1 小约 18%，耗时约为默认等级 6 的一半。
+    """
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    content = np.any(rgba[:, :, :3] != 255, axis=2)
+    rows = np.flatnonzero(content.any(axis=1))
+    cols = np.flatnonzero(content.any(axis=0))
+    if len(rows) > 0:
+        rgba = rgba[
+            max(0, rows[0] - pad_px):rows[-1] + 1 + pad_px,
+            max(0, cols[0] - pad_px):cols[-1] + 1 + pad_px
+        ]
+
+    buf = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(buf, format='PNG', compress_level=4)
+    # base64 结果必为 ASCII，直接编码缓冲区视图，免去 getvalue 的整段复制
+    return base64.b64encode(buf.getbuffer()).decode('ascii')
+
+
+def _symmetric_vlim(values: np.ndarray) -> tuple[float, float]:
+    """按最大绝对值计算对称色阶范围（与 MNE plot_topomap 默认色阶一致）"""
+    vmax = float(np.max(np.abs(values)))
+    return -vmax, vmax
+
+
+def _iter_topomap_images(
+    frame_values: list[np.ndarray],
+    pos_array: np.ndarray,
+    ch_names: list[str],
+    contours: int,
+    sensors: bool,
+    vlim: tuple[float, float]
+) -> Iterator[str]:
+    """用 MNE 依次绘制一组地形图（带 colorbar），逐帧产出 PNG 的 base64 字符串
+
+    整组只创建一个 Figure：每帧清空坐标轴重绘；所有帧共用同一色阶 vlim，
+    colorbar 在循环前按该色阶绘制一次，之后不再更新。
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # 使用非交互式后端
+    import matplotlib.pyplot as plt
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.colors import Normalize
+
+    # 创建图形
+    fig, ax = plt.subplots(figsize=(7, 5), dpi=100)  # 稍微加宽以容纳 colorbar
+    try:
+        # 静态 colorbar（色阶固定，各帧颜色可直接比较）
+        cbar = fig.colorbar(
+            ScalarMappable(norm=Normalize(vmin=vlim[0], vmax=vlim[1]), cmap='RdBu_r'),
+            ax=ax,
+            shrink=0.6
+        )
+        cbar.set_label('Amplitude (µV)', fontsize=10)
+        cbar.ax.tick_params(labelsize=8)
+
+        for values in frame_values:
+            ax.clear()
+
+            # 使用 MNE 绘制地形图
+            mne.viz.plot_topomap(
+                data=values,
+                pos=pos_array,
+                axes=ax,
+                vlim=vlim,
+                cmap='RdBu_r',
+                contours=contours,
+                sensors=sensors,
+                names=ch_names if sensors else None,
+                show=False
+            )
+
+            # 转换为 base64
+            yield _encode_figure_png(fig)
+    finally:
+        plt.close(fig)
+
+
+def _render_topomap_images(
+    frame_values: list[np.ndarray],
+    pos_array: np.ndarray,
+    ch_names: list[str],
+    contours: int,
+    sensors: bool,
+    vlim: tuple[float, float]
+) -> list[str]:
+    """一次性绘制一组地形图，返回各帧 PNG 的 base64 字符串
+
+    为模块级函数，动画帧可分块提交到进程池并行渲染。
+    """
+    return list(_iter_topomap_images(frame_values, pos_array, ch_names, contours, sensors, vlim))
+
+
+def _iter_topomap_images_parallel(
+    frame_values: list[np.ndarray],
+    pos_array: np.ndarray,
+    ch_names: list[str],
+    contours: int,
+    sensors: bool,
+    vlim: tuple[float, float],
+    n_workers: int
+) -> Iterator[str]:
+    """用进程池按帧块并行绘制地形图，按帧顺序逐帧产出结果
+
+    帧块切得比进程数更细，使前面的帧可以尽早产出（便于流式返回）；每块在一个进程内复用同一个 Figure。
+    """
+    n_batches = min(len(frame_values), n_workers * 4)
+    bounds = np.linspace(0, len(frame_values), n_batches + 1).astype(int)
+    batches = [frame_values[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+    render_args = (repeat(pos_array), repeat(ch_names), repeat(contours), repeat(sensors), repeat(vlim))
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        for batch_images in executor.map(_render_topomap_images, batches, *render_args):
+            yield from batch_images
+
+
+def _pack_waveform_binary(waveform: WaveformResponse, matrix: np.ndarray) -> bytes:
+    """将波形头信息与采样矩阵打包为二进制帧
+
+    帧格式：4 字节小端 uint32 头长度 + UTF-8 JSON 头（即不含 data_b64 的 WaveformResponse，
+    末尾用空格补齐使采样数据按 4 字节对齐）+ 行优先小端 float32 采样矩阵。
+    采样矩阵直接写入原始字节，不经过 base64；前端可直接用 Float32Array 视图读取。
+    """
+    header = waveform.model_dump_json(exclude={'data_b64'}).encode('utf-8')
+    header += b' ' * (-(4 + len(header)) % 4)
+    return b''.join((struct.pack('<I', len(header)), header, matrix.tobytes()))
+
+
+def _export_raw_file(export_module, output_path: str, raw: mne.io.BaseRaw, fmt: str) -> None:
+    """调用 mne.export.export_raw 导出文件，兼容不支持 overwrite 参数的旧版本。"""
+    try:
+        export_module.export_raw(
+            output_path,  # 第一个参数是文件路径
+            raw,  # 第二个参数是 Raw 对象
+            fmt=fmt,
+            overwrite=True,
+            verbose=False
+        )
+    except TypeError as e:
+        # 旧版本 mne.export 可能不支持 overwrite 参数
+        if 'overwrite' not in str(e):
+            raise
+        # 先删除现有文件
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        export_module.export_raw(
+            output_path,
+            raw,
+            fmt=fmt,
+            verbose=False
+        )
+
+
 class EEGService:
     """EEG 数据处理服务"""
     
@@ -583,10 +900,36 @@ class EEGService:
         duration: float,
         target_sfreq: int = 250
     ) -> WaveformResponse:
-        """获取波形数据（降采样），如果有epochs则返回epoch数据"""
+        """获取波形数据（降采样），如果有epochs则返回epoch数据；采样矩阵以 base64 放在 data_b64 中"""
+        waveform, matrix = EEGService._get_waveform_frame(session, start_time, duration, target_sfreq)
+        waveform.data_b64 = base64.b64encode(matrix).decode('ascii')
+        return waveform
+
+    @staticmethod
+    def get_waveform_binary(
+        session: EEGSession,
+        start_time: float,
+        duration: float,
+        target_sfreq: int = 250
+    ) -> bytes:
+        """获取波形数据的二进制帧（格式见 _pack_waveform_binary）"""
+        waveform, matrix = EEGService._get_waveform_frame(session, start_time, duration, target_sfreq)
+        return _pack_waveform_binary(waveform, matrix)
+
+    @staticmethod
+    def _get_waveform_frame(
+        session: EEGSession,
+        start_time: float,
+        duration: float,
+        target_sfreq: int = 250
+    ) -> tuple[WaveformResponse, np.ndarray]:
+        """构建波形头信息（data_b64 为空）与 (n_channels, n_samples) 小端 float32 采样矩阵
+
+        JSON 接口与二进制接口共用；只有 JSON 接口才对矩阵做 base64 编码。
+        """
         # 优先使用epochs数据
         if session.epochs is not None:
-            return eeg_service._get_epoch_waveform(
+            return EEGService._get_epoch_waveform(
                 session.epochs,
                 start_time,
                 duration,
@@ -616,16 +959,13 @@ class EEGService:
         
         # 只返回 EEG 通道
         eeg_picks = mne.pick_types(raw.info, eeg=True, exclude=[])
+        display_picks = eeg_picks[:settings.MAX_CHANNELS_DISPLAY]
         
-        channels = []
-        for idx in eeg_picks[:settings.MAX_CHANNELS_DISPLAY]:
-            ch_name = raw.ch_names[idx]
-            ch_data = data[idx, :] * 1e6  # 转换为 µV
-            channels.append(WaveformChannel(
-                name=ch_name,
-                data=ch_data.tolist(),
-                is_bad=ch_name in raw.info['bads']
-            ))
+        channels = [
+            WaveformChannel(name=raw.ch_names[idx], is_bad=raw.ch_names[idx] in raw.info['bads'])
+            for idx in display_picks
+        ]
+        matrix = _as_float32_matrix(data[display_picks] * 1e6)  # 转换为 µV
         
         # 获取时间范围内的事件
         events_list = []
@@ -664,13 +1004,15 @@ class EEGService:
         except Exception as e:
             print(f"获取波形事件失败: {e}")
         
-        return WaveformResponse(
+        waveform = WaveformResponse(
             time_range=(float(start_time), float(end_time)),
             sample_rate=target_sfreq,
             channels=channels,
+            shape=matrix.shape,
             events=events_list,
             is_epoch=False
         )
+        return waveform, matrix
     
     @staticmethod
     def _get_epoch_waveform(
@@ -678,8 +1020,8 @@ class EEGService:
         start_time: float,
         duration: float,
         target_sfreq: int = 250
-    ) -> WaveformResponse:
-        """获取epoch波形数据（一段一段显示）
+    ) -> tuple[WaveformResponse, np.ndarray]:
+        """获取epoch波形数据（一段一段显示），返回头信息与采样矩阵（同 _get_waveform_frame）
         
         Args:
             start_time: 起始epoch索引（为了兼容API，这里作为epoch索引使用）
@@ -716,41 +1058,32 @@ class EEGService:
         
         # 只返回 EEG 通道
         eeg_picks = mne.pick_types(epochs.info, eeg=True, exclude=[])
+        display_picks = eeg_picks[:settings.MAX_CHANNELS_DISPLAY]
         
-        channels = []
-        for idx in eeg_picks[:settings.MAX_CHANNELS_DISPLAY]:
-            ch_name = epochs.ch_names[idx]
-            
-            # 将所有epoch的数据拼接起来，epoch之间用特殊标记值分隔（用于前端识别）
-            # 使用一个非常小的值作为分隔标记（-1e10，远小于正常EEG数据范围）
-            SEPARATOR_VALUE = -1e10
-            all_epoch_data = []
-            for epoch_idx in range(selected_epochs.shape[0]):
-                epoch_ch_data = selected_epochs[epoch_idx, idx, :] * 1e6  # 转换为 µV
-                
-                # 降采样
-                if sfreq > target_sfreq:
-                    factor = int(sfreq / target_sfreq)
-                    epoch_ch_data = epoch_ch_data[::factor]
-                
-                all_epoch_data.extend(epoch_ch_data.tolist())
-                
-                # 在epoch之间添加分隔标记（除了最后一个）
-                if epoch_idx < selected_epochs.shape[0] - 1:
-                    all_epoch_data.append(SEPARATOR_VALUE)
-            
-            channels.append(WaveformChannel(
-                name=ch_name,
-                data=all_epoch_data,
-                is_bad=ch_name in epochs.info['bads']
-            ))
+        # 降采样步长
+        factor = int(sfreq / target_sfreq) if sfreq > target_sfreq else 1
+        
+        # 将所有epoch的数据拼接起来，epoch之间用特殊标记值分隔（用于前端识别）
+        assembled = _assemble_epoch_channels(
+            selected_epochs, display_picks, factor, EPOCH_SEPARATOR_VALUE, 1e6  # 转换为 µV
+        )
+        
+        channels = [
+            WaveformChannel(name=epochs.ch_names[idx], is_bad=epochs.ch_names[idx] in epochs.info['bads'])
+            for idx in display_picks
+        ]
+        matrix = _as_float32_matrix(assembled)
         
         # 计算总时间范围
         total_duration = selected_epochs.shape[0] * epoch_duration
         start_time = start_epoch_idx * epoch_duration
         end_time = start_time + total_duration
         
-        # 获取事件信息（从epoch的event_id）
+        # 获取事件信息（从epoch的event_id），事件 ID -> 标签的反查表只构建一次（同一 ID 取首个标签）
+        id_to_label = {}
+        for label, eid in (epochs.event_id or {}).items():
+            id_to_label.setdefault(eid, label)
+        
         events_list = []
         try:
             for epoch_idx in range(start_epoch_idx, end_epoch_idx):
@@ -761,12 +1094,7 @@ class EEGService:
                     event_time = start_time + relative_epoch_idx * epoch_duration
                     
                     # 获取事件标签
-                    event_label = None
-                    if epochs.event_id:
-                        for label, eid in epochs.event_id.items():
-                            if eid == event_id:
-                                event_label = label
-                                break
+                    event_label = id_to_label.get(event_id)
                     
                     events_list.append(WaveformEvent(
                         time=float(event_time),
@@ -776,14 +1104,16 @@ class EEGService:
         except Exception as e:
             print(f"获取epoch事件失败: {e}")
         
-        return WaveformResponse(
+        waveform = WaveformResponse(
             time_range=(float(start_time), float(end_time)),
             sample_rate=target_sfreq,
             channels=channels,
+            shape=matrix.shape,
             events=events_list,
             is_epoch=True,
             n_epochs=len(epochs)
         )
+        return waveform, matrix
     
     # ============ 预处理操作 ============
     
@@ -806,13 +1136,17 @@ class EEGService:
             "notch_freq": notch_freq
         })
         
+        # 打包环境强制单进程，开发环境可通过 FILTER_N_JOBS 按通道并行滤波
+        filter_n_jobs = 1 if IS_FROZEN else max(1, int(settings.FILTER_N_JOBS))
+        session.ensure_raw_writable()
+        
         # 带通滤波
         if l_freq is not None or h_freq is not None:
-            raw.filter(l_freq=l_freq, h_freq=h_freq, fir_design='firwin')
+            raw.filter(l_freq=l_freq, h_freq=h_freq, fir_design='firwin', n_jobs=filter_n_jobs)
         
         # 陷波滤波
         if notch_freq is not None:
-            raw.notch_filter(freqs=notch_freq)
+            raw.notch_filter(freqs=notch_freq, n_jobs=filter_n_jobs)
         
         session.add_history("filter", {
             "l_freq": l_freq, 
@@ -846,6 +1180,7 @@ class EEGService:
         
         # 保存状态到撤销栈
         session.save_state("rereference", {"method": method, "custom_ref": custom_ref})
+        session.ensure_raw_writable()
         
         if method == "average":
             raw.set_eeg_reference(ref_channels='average', projection=False)
@@ -929,7 +1264,7 @@ class EEGService:
         session.save_state("set_montage", {"montage_name": montage_name})
 
         try:
-            montage = mne.channels.make_standard_montage(montage_name)
+            montage = _load_standard_montage(montage_name)
             montage_ch_names = set(montage.ch_names)
             raw_ch_names = set(raw.ch_names)
             
@@ -953,8 +1288,8 @@ class EEGService:
             return {
                 "matched_channels": len(matched),
                 "unmatched_channels": len(unmatched),
-                "matched_list": list(matched)[:10],  # 只返回前10个
-                "unmatched_list": list(unmatched)[:10]
+                "matched_list": list(islice(matched, 10)),  # 只返回前10个
+                "unmatched_list": list(islice(unmatched, 10))
             }
         except Exception as e:
             raise ValueError(f"设置 montage 失败: {str(e)}")
@@ -1021,6 +1356,12 @@ class EEGService:
         if settings.ICA_FIT_MAX_SFREQ and fit_raw.info["sfreq"] > settings.ICA_FIT_MAX_SFREQ:
             fit_raw.resample(settings.ICA_FIT_MAX_SFREQ, npad="auto")
 
+        # 平均参考、坏道插值等会降低数据秩，成分数超过秩只会让 ICA 在冗余成分上空转
+        data_rank = mne.compute_rank(fit_raw, rank=None, verbose=False).get('eeg', n_components)
+        if data_rank < n_components:
+            print(f"[ICA] 数据秩为 {data_rank}，成分数由 {n_components} 下调为 {data_rank}")
+            n_components = max(1, data_rank)
+
         print(
             f"[ICA] 拟合数据: {len(fit_raw.ch_names)} 通道, "
             f"{fit_raw.times[-1]:.1f}s, {fit_raw.info['sfreq']}Hz, "
@@ -1042,7 +1383,7 @@ class EEGService:
         # ICLabel 需要 montage 生成地形图特征，没有则临时套用标准 10-20
         if fit_raw.get_montage() is None:
             try:
-                montage = mne.channels.make_standard_montage('standard_1020')
+                montage = _load_standard_montage('standard_1020')
                 fit_raw.set_montage(montage, on_missing='ignore', verbose=False)
                 print("[ICA] 临时设置 standard_1020 montage 用于 ICLabel 特征提取")
             except Exception as e:
@@ -1087,6 +1428,7 @@ class EEGService:
 
         # ---- 7. 应用 ICA 到原始数据 ----
         ica.exclude = excluded_ics
+        session.ensure_raw_writable()
         ica.apply(raw)
 
         if excluded_ics:
@@ -1150,15 +1492,17 @@ class EEGService:
         if events is None or len(events) == 0:
             raise ValueError("未检测到任何事件，无法创建 Epochs")
         
-        # 只保留指定的事件 ID
-        mask = np.isin(events[:, 2], event_ids)
+        # 只保留指定的事件 ID（去重后的有序 ID 数组，isin 内部走排序查找）
+        wanted_ids = np.unique(np.asarray(event_ids, dtype=events.dtype))
+        mask = np.isin(events[:, 2], wanted_ids)
         filtered_events = events[mask]
         
         if len(filtered_events) == 0:
             raise ValueError(f"未找到指定事件 ID {event_ids} 的事件")
         
-        # 构建事件 ID 字典
-        event_id_dict = {f"event_{eid}": eid for eid in event_ids if eid in filtered_events[:, 2]}
+        # 构建事件 ID 字典（实际出现的 ID 只统计一次，避免逐个 ID 扫描整列）
+        present_ids = set(np.unique(filtered_events[:, 2]).tolist())
+        event_id_dict = {f"event_{eid}": eid for eid in event_ids if eid in present_ids}
         
         # 设置拒绝阈值
         reject = None
@@ -1217,18 +1561,9 @@ class EEGService:
 
         # 处理 annotations 中的事件重命名
         if raw.annotations and len(raw.annotations) > 0:
-            # 创建新的 descriptions 列表
-            new_descriptions = list(raw.annotations.description)
-            
-            for i, desc in enumerate(new_descriptions):
-                # 尝试将 description 转换为整数事件 ID
-                try:
-                    event_id = int(desc)
-                    if event_id in event_mappings:
-                        new_descriptions[i] = event_mappings[event_id]
-                except ValueError:
-                    # 如果不是数字，检查是否已经在映射中
-                    pass
+            # 以事件 ID 的字符串形式作为键，直接查表替换 description（非数字描述保持不变）
+            str_mappings = {str(event_id): label for event_id, label in event_mappings.items()}
+            new_descriptions = [str_mappings.get(desc, desc) for desc in raw.annotations.description]
             
             # 创建新的 annotations
             new_annotations = mne.Annotations(
@@ -1245,20 +1580,11 @@ class EEGService:
         # 如果已经有 epochs，也需要更新 epochs 的事件 ID 字典
         if session.epochs is not None:
             epochs = session.epochs
-            # 获取当前的事件 ID 字典
-            current_event_id = epochs.event_id.copy()
-            
-            # 创建新的事件 ID 字典，使用新的标签
-            new_event_id = {}
-            for old_key, event_val in current_event_id.items():
-                if event_val in event_mappings:
-                    new_key = event_mappings[event_val]
-                    new_event_id[new_key] = event_val
-                else:
-                    new_event_id[old_key] = event_val
-            
-            # 更新 epochs 的事件 ID
-            epochs.event_id = new_event_id
+            # 创建新的事件 ID 字典，使用新的标签，并更新 epochs 的事件 ID
+            epochs.event_id = {
+                event_mappings.get(event_val, old_key): event_val
+                for old_key, event_val in epochs.event_id.items()
+            }
     
     # ============ 可视化数据 ============
     
@@ -1283,8 +1609,12 @@ class EEGService:
         if len(available_channels) == 0:
             raise ValueError(f"所选通道 {channels} 在数据中不存在。可用通道: {epochs.ch_names[:10]}...")
         
-        # 选择通道
-        epochs_picked = epochs.copy().pick_channels(available_channels)
+        # 选择通道：只取一次所选通道的全部 epoch 数据（按通道索引切片得到的是副本），
+        # 并原地换算为 µV，各条件共用这一块数据
+        picks = [epochs.ch_names.index(ch) for ch in available_channels]
+        all_data = epochs.get_data(picks=picks, copy=False)
+        np.multiply(all_data, 1e6, out=all_data)
+        event_codes = epochs.events[:, 2]
         
         times_ms = (epochs.times * 1000).tolist()  # 转换为 ms
         
@@ -1292,28 +1622,27 @@ class EEGService:
         conditions = {}
         channel_data = {} if per_channel else None
         
-        for event_name in epochs.event_id.keys():
-            evoked = epochs_picked[event_name].average()
+        for event_name, event_code in epochs.event_id.items():
+            epoch_data = all_data[event_codes == event_code]
+            if len(epoch_data) == 0:
+                # 该条件的 epochs 已全部被剔除
+                continue
+            evoked_uv = epoch_data.mean(axis=0)
             
             if per_channel:
                 # 返回每个通道的数据
-                channel_data[event_name] = {}
-                for ch_idx, ch_name in enumerate(available_channels):
-                    ch_data = evoked.data[ch_idx, :] * 1e6  # 转换为 µV
-                    
-                    # 计算标准误（该通道在所有epochs上的标准差）
-                    epoch_data = epochs_picked[event_name].get_data() * 1e6
-                    ch_epoch_data = epoch_data[:, ch_idx, :]
-                    stderr = ch_epoch_data.std(axis=0) / np.sqrt(len(ch_epoch_data))
-                    
-                    channel_data[event_name][ch_name] = {
-                        "data": ch_data.tolist(),
-                        "stderr": stderr.tolist()
+                # 所有通道的标准误一次算出（各通道在所有epochs上的标准差），按行取用
+                channel_stderr = epoch_data.std(axis=0) / np.sqrt(len(epoch_data))
+                channel_data[event_name] = {
+                    ch_name: {
+                        "data": evoked_uv[ch_idx].tolist(),
+                        "stderr": channel_stderr[ch_idx].tolist()
                     }
+                    for ch_idx, ch_name in enumerate(available_channels)
+                }
                 
                 # 同时计算平均后的数据（用于兼容）
-                data = evoked.data.mean(axis=0) * 1e6
-                epoch_data = epochs_picked[event_name].get_data() * 1e6
+                data = evoked_uv.mean(axis=0)
                 stderr = epoch_data.mean(axis=1).std(axis=0) / np.sqrt(len(epoch_data))
                 conditions[event_name] = {
                     "data": data.tolist(),
@@ -1321,10 +1650,9 @@ class EEGService:
                 }
             else:
                 # 返回通道平均后的数据
-                data = evoked.data.mean(axis=0) * 1e6  # 平均通道，转换为 µV
+                data = evoked_uv.mean(axis=0)  # 平均通道
                 
                 # 计算标准误
-                epoch_data = epochs_picked[event_name].get_data() * 1e6
                 stderr = epoch_data.mean(axis=1).std(axis=0) / np.sqrt(len(epoch_data))
                 
                 conditions[event_name] = {
@@ -1406,34 +1734,12 @@ class EEGService:
             - channel_count: 通道数量
             - sample_channels: 前5个通道名示例
         """
-        standard_montages = [
-            "standard_1020",
-            "standard_1005",
-            "standard_alphabetic",
-            "standard_prefixed",
-            "standard_postfixed",
-            "biosemi16",
-            "biosemi32",
-            "biosemi64",
-            "easycap-M1",
-            "easycap-M10"
+        # 列表已缓存，返回副本避免调用方修改缓存内容
+        return [
+            {**info, "sample_channels": list(info["sample_channels"])}
+            for info in _available_montages()
         ]
 
-        montage_info = []
-        for name in standard_montages:
-            try:
-                montage = mne.channels.make_standard_montage(name)
-                montage_info.append({
-                    "name": name,
-                    "channel_count": len(montage.ch_names),
-                    "sample_channels": montage.ch_names[:5]
-                })
-            except Exception:
-                # 跳过无法加载的蒙特卡
-                pass
-
-        return montage_info
-
     @staticmethod
     def get_topomap_data(
         session: EEGSession,
@@ -1474,27 +1780,15 @@ class EEGService:
 
         # 提取通道名称和位置（只需提取一次）
         ch_names = epochs.ch_names
-        positions = []
-        for ch_idx, ch_name in enumerate(ch_names):
-            if ch_idx < len(epochs.info['chs']):
-                ch_info = epochs.info['chs'][ch_idx]
-                if ch_info['loc'] is not None and len(ch_info['loc']) >= 3:
-                    positions.append({
-                        "x": float(ch_info['loc'][0]),
-                        "y": float(ch_info['loc'][1]),
-                        "z": float(ch_info['loc'][2]) if len(ch_info['loc']) > 2 else 0.0
-                    })
-                else:
-                    positions.append({"x": 0.0, "y": 0.0, "z": 0.0})
-            else:
-                positions.append({"x": 0.0, "y": 0.0, "z": 0.0})
+        locs = _channel_locations(epochs.info)
+        positions = [{"x": x, "y": y, "z": z} for x, y, z in locs.tolist()]
 
         # 计算地形图数据
         if time_point is not None:
             # ===== 电位地形图：显示特定时间点的 ERP =====
             evoked = epochs.average()
             time_sec = time_point / 1000.0
-            time_idx = np.argmin(np.abs(evoked.times - time_sec))
+            time_idx = _nearest_time_indices(evoked.times, time_sec)[0]
             data = evoked.data[:, time_idx] * 1e6  # 转换为 µV
 
         else:
@@ -1525,78 +1819,15 @@ class EEGService:
         # 图像生成（如果请求）
         image_base64 = None
         if render_mode == 'image':
-            import io
-            import base64
-            import matplotlib
-            matplotlib.use('Agg')  # 使用非交互式后端
-            import matplotlib.pyplot as plt
-
             # 归一化电极位置（与前端Canvas静态地形图一致）
-            # 为 A1/A2 设置正确的耳朵位置
-            pos_array_normalized = []
-            valid_ch_names = []
-            for ch_name, p in zip(ch_names, positions):
-                x3d, y3d, z3d = p['x'], p['y'], p['z']
-                r3d = np.sqrt(x3d**2 + y3d**2 + z3d**2)
-
-                # A1/A2 位置修正：如果位置无效，手动设置到耳朵位置
-                if ch_name.upper() in ['A1', 'A2']:
-                    if r3d < 0.01:  # 位置数据无效
-                        # A1 在左耳，A2 在右耳（标准 10-20 系统位置）
-                        if ch_name.upper() == 'A1':
-                            x3d, y3d, z3d = -0.5, 0.0, 0.0
-                        else:  # A2
-                            x3d, y3d, z3d = 0.5, 0.0, 0.0
-                        r3d = np.sqrt(x3d**2 + y3d**2 + z3d**2)
-
-                # 跳过其他无效位置
-                if r3d < 0.01:
-                    continue
-
-                # 归一化到单位球面
-                x_norm = x3d / r3d
-                y_norm = y3d / r3d
-                z_norm = z3d / r3d
-
-                # 只显示上半球和侧面电极（z > -0.5，允许A1/A2等耳部电极）
-                if z_norm < -0.5:
-                    continue
-
-                pos_array_normalized.append([x_norm, y_norm])
-                valid_ch_names.append(ch_name)
-
-            if not pos_array_normalized or not valid_ch_names:
+            pos_array, valid_idx, valid_ch_names = _normalize_topomap_positions(ch_names, locs)
+            if not valid_ch_names:
                 raise ValueError("缺少有效电极位置，无法生成 MNE 地形图。请先设置 Montage。")
 
-            pos_array = np.array(pos_array_normalized)
-            valid_data = data[[ch_names.index(ch) for ch in valid_ch_names]]
-
-            # 创建图形
-            fig, ax = plt.subplots(figsize=(7, 5))  # 稍微加宽以容纳 colorbar
-
-            # 使用 MNE 绘制地形图
-            im, _ = mne.viz.plot_topomap(
-                data=valid_data,
-                pos=pos_array,
-                axes=ax,
-                cmap='RdBu_r',
-                contours=contours,
-                sensors=sensors,
-                names=valid_ch_names if sensors else None,
-                show=False
-            )
-
-            # 添加 colorbar
-            cbar = plt.colorbar(im, ax=ax, shrink=0.6)
-            cbar.set_label('Amplitude (µV)', fontsize=10)
-            cbar.ax.tick_params(labelsize=8)
-
-            # 转换为 base64
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-            buf.seek(0)
-            image_base64 = base64.b64encode(buf.read()).decode('utf-8')
-            plt.close(fig)
+            valid_data = data[valid_idx]
+            image_base64 = _render_topomap_images(
+                [valid_data], pos_array, valid_ch_names, contours, sensors, _symmetric_vlim(valid_data)
+            )[0]
 
         return TopomapData(
             channel_names=ch_names,
@@ -1645,6 +1876,64 @@ class EEGService:
                 render_mode: 'image'
             }
         """
+        epochs, evoked, time_points_sec, time_indices = eeg_service._resolve_animation_frames(
+            session, start_time, end_time, frame_interval
+        )
+
+        if render_mode == 'data':
+            # Canvas 风格：返回数据
+            # 提取通道名称和位置
+            ch_names = epochs.ch_names
+            locs = _channel_locations(epochs.info)
+            positions = [{"x": x, "y": y, "z": z} for x, y, z in locs.tolist()]
+
+            # 一次取出全部帧的 (帧数, 通道数) 数据块并换算为 µV，整块转换为列表
+            frame_values = (evoked.data[:, time_indices].T * 1e6).tolist()
+            frames = [
+                {"time_ms": float(time_sec * 1000.0), "values": values}
+                for time_sec, values in zip(time_points_sec, frame_values)
+            ]
+
+            return {
+                "frames": frames,
+                "channel_names": ch_names,
+                "positions": positions,
+                "frame_count": len(frames),
+                "duration_ms": float(end_time - start_time),
+                "interval_ms": float(frame_interval),
+                "render_mode": "data"
+            }
+
+        else:
+            # MNE 风格：生成图片帧
+            images = eeg_service._iter_animation_images(
+                epochs, evoked, time_indices, contours, sensors
+            )
+            frames = [
+                {"time_ms": float(time_sec * 1000.0), "image_base64": img_base64}
+                for time_sec, img_base64 in zip(time_points_sec, images)
+            ]
+
+            return {
+                "frames": frames,
+                "frame_count": len(frames),
+                "duration_ms": float(end_time - start_time),
+                "interval_ms": float(frame_interval),
+                "render_mode": "image"
+            }
+
+    @staticmethod
+    def _resolve_animation_frames(
+        session: EEGSession,
+        start_time: float,
+        end_time: float,
+        frame_interval: float
+    ) -> tuple[mne.Epochs, mne.Evoked, np.ndarray, np.ndarray]:
+        """校验动画参数并计算 ERP 与各帧时间点
+
+        Returns:
+            (epochs, evoked, 各帧时间点（秒）, 各帧对应的采样索引)
+        """
         epochs = session.epochs
         if epochs is None:
             raise ValueError(
@@ -1653,23 +1942,6 @@ class EEGService:
                 "建议：请先进行分段（Epoching）操作。"
             )
 
-        # 提取通道名称和位置
-        ch_names = epochs.ch_names
-        positions = []
-        for ch_idx, ch_name in enumerate(ch_names):
-            if ch_idx < len(epochs.info['chs']):
-                ch_info = epochs.info['chs'][ch_idx]
-                if ch_info['loc'] is not None and len(ch_info['loc']) >= 3:
-                    positions.append({
-                        "x": float(ch_info['loc'][0]),
-                        "y": float(ch_info['loc'][1]),
-                        "z": float(ch_info['loc'][2]) if len(ch_info['loc']) > 2 else 0.0
-                    })
-                else:
-                    positions.append({"x": 0.0, "y": 0.0, "z": 0.0})
-            else:
-                positions.append({"x": 0.0, "y": 0.0, "z": 0.0})
-
         # 计算 ERP 平均
         evoked = epochs.average()
 
@@ -1690,121 +1962,75 @@ class EEGService:
                 f"{evoked.times[0]*1000:.0f}-{evoked.times[-1]*1000:.0f} ms"
             )
 
-        if render_mode == 'data':
-            # Canvas 风格：返回数据
-            frames = []
-            for time_sec in time_points_sec:
-                time_ms = time_sec * 1000.0
-                time_idx = np.argmin(np.abs(evoked.times - time_sec))
-                data = evoked.data[:, time_idx] * 1e6  # µV
-
-                frames.append({
-                    "time_ms": float(time_ms),
-                    "values": data.astype(float).tolist()
-                })
-
-            return {
-                "frames": frames,
-                "channel_names": ch_names,
-                "positions": positions,
-                "frame_count": len(frames),
-                "duration_ms": float(end_time - start_time),
-                "interval_ms": float(frame_interval),
-                "render_mode": "data"
-            }
-
-        else:
-            # MNE 风格：生成图片帧
-            import io
-            import base64
-            import matplotlib
-            matplotlib.use('Agg')
-            import matplotlib.pyplot as plt
+        # 一次性解析所有帧对应的采样索引
+        time_indices = _nearest_time_indices(evoked.times, time_points_sec)
+        return epochs, evoked, time_points_sec, time_indices
 
-            # 归一化电极位置（与前端Canvas静态地形图一致）
-            # 为 A1/A2 设置正确的耳朵位置
-            pos_array_normalized = []
-            valid_ch_names = []
-            for ch_name, p in zip(ch_names, positions):
-                x3d, y3d, z3d = p['x'], p['y'], p['z']
-                r3d = np.sqrt(x3d**2 + y3d**2 + z3d**2)
-
-                # A1/A2 位置修正：如果位置无效，手动设置到耳朵位置
-                if ch_name.upper() in ['A1', 'A2']:
-                    if r3d < 0.01:  # 位置数据无效
-                        # A1 在左耳，A2 在右耳（标准 10-20 系统位置）
-                        if ch_name.upper() == 'A1':
-                            x3d, y3d, z3d = -0.5, 0.0, 0.0
-                        else:  # A2
-                            x3d, y3d, z3d = 0.5, 0.0, 0.0
-                        r3d = np.sqrt(x3d**2 + y3d**2 + z3d**2)
-
-                # 跳过其他无效位置
-                if r3d < 0.01:
-                    continue
-
-                # 归一化到单位球面
-                x_norm = x3d / r3d
-                y_norm = y3d / r3d
-                z_norm = z3d / r3d
-
-                # 只显示上半球和侧面电极（z > -0.5，允许A1/A2等耳部电极）
-                if z_norm < -0.5:
-                    continue
-
-                pos_array_normalized.append([x_norm, y_norm])
-                valid_ch_names.append(ch_name)
-
-            if not pos_array_normalized or not valid_ch_names:
-                raise ValueError("缺少有效电极位置，无法生成 MNE 动画。请先设置 Montage。")
-
-            pos_array = np.array(pos_array_normalized)
-
-            frames = []
-            for time_sec in time_points_sec:
-                time_ms = time_sec * 1000.0
-                time_idx = np.argmin(np.abs(evoked.times - time_sec))
-                data = evoked.data[:, time_idx] * 1e6  # µV
-
-                # 过滤到有效通道的数据
-                valid_data = data[[ch_names.index(ch) for ch in valid_ch_names]]
-
-                # 生成单帧图像（添加 colorbar）
-                fig, ax = plt.subplots(figsize=(7, 5))  # 稍微加宽以容纳 colorbar
-                im, _ = mne.viz.plot_topomap(
-                    data=valid_data,
-                    pos=pos_array,
-                    axes=ax,
-                    cmap='RdBu_r',
-                    contours=contours,
-                    sensors=sensors,
-                    names=valid_ch_names if sensors else None,
-                    show=False
-                )
+    @staticmethod
+    def _iter_animation_images(
+        epochs: mne.Epochs,
+        evoked: mne.Evoked,
+        time_indices: np.ndarray,
+        contours: int,
+        sensors: bool
+    ) -> Iterator[str]:
+        """校验电极位置后返回按帧顺序产出 PNG base64 的迭代器（实际渲染在迭代时进行）"""
+        # 归一化电极位置（与前端Canvas静态地形图一致）
+        ch_names = epochs.ch_names
+        pos_array, valid_idx, valid_ch_names = _normalize_topomap_positions(
+            ch_names, _channel_locations(epochs.info)
+        )
+        if not valid_ch_names:
+            raise ValueError("缺少有效电极位置，无法生成 MNE 动画。请先设置 Montage。")
+
+        # 各帧有效通道的数据（µV）：一次取出 (帧数, 通道数) 数据块
+        frame_block = evoked.data[np.ix_(valid_idx, time_indices)].T * 1e6
+        frame_values = list(frame_block)
+        # 全部帧共用同一对称色阶，colorbar 只需绘制一次
+        vlim = _symmetric_vlim(frame_block)
+
+        # 各帧相互独立：打包环境强制单进程，开发环境可通过 TOPOMAP_RENDER_WORKERS 多进程并行渲染
+        n_workers = 1 if IS_FROZEN else max(1, int(settings.TOPOMAP_RENDER_WORKERS))
+        n_workers = min(n_workers, len(frame_values))
+        if n_workers > 1:
+            return _iter_topomap_images_parallel(
+                frame_values, pos_array, valid_ch_names, contours, sensors, vlim, n_workers
+            )
+        return _iter_topomap_images(frame_values, pos_array, valid_ch_names, contours, sensors, vlim)
 
-                # 添加 colorbar
-                cbar = plt.colorbar(im, ax=ax, shrink=0.6)
-                cbar.set_label('Amplitude (µV)', fontsize=10)
-                cbar.ax.tick_params(labelsize=8)
+    @staticmethod
+    def stream_topomap_animation_images(
+        session: EEGSession,
+        start_time: float,  # ms
+        end_time: float,    # ms
+        frame_interval: float = 20.0,  # ms
+        contours: int = 8,
+        sensors: bool = True
+    ) -> tuple[dict, Iterator[dict]]:
+        """流式生成 MNE 风格地形图动画帧
 
-                buf = io.BytesIO()
-                fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-                buf.seek(0)
-                img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-                plt.close(fig)
+        参数校验在调用时立即完成（出错直接抛出 ValueError），帧在迭代时逐个渲染。
 
-                frames.append({
-                    "time_ms": float(time_ms),
-                    "image_base64": img_base64
-                })
+        Returns:
+            (动画元数据 {frame_count, duration_ms, interval_ms, render_mode},
+             逐帧产出 {time_ms, image_base64} 的迭代器)
+        """
+        epochs, evoked, time_points_sec, time_indices = eeg_service._resolve_animation_frames(
+            session, start_time, end_time, frame_interval
+        )
+        images = eeg_service._iter_animation_images(epochs, evoked, time_indices, contours, sensors)
 
-            return {
-                "frames": frames,
-                "frame_count": len(frames),
-                "duration_ms": float(end_time - start_time),
-                "interval_ms": float(frame_interval),
-                "render_mode": "image"
-            }
+        header = {
+            "frame_count": len(time_points_sec),
+            "duration_ms": float(end_time - start_time),
+            "interval_ms": float(frame_interval),
+            "render_mode": "image"
+        }
+        frames = (
+            {"time_ms": float(time_sec * 1000.0), "image_base64": img_base64}
+            for time_sec, img_base64 in zip(time_points_sec, images)
+        )
+        return header, frames
 
     @staticmethod
     def crop_data(session: EEGSession, tmin: float, tmax: Optional[float] = None):
@@ -1869,10 +2095,8 @@ class EEGService:
 
         elif format in ('edf', 'set'):
             # 其他格式 - 使用 mne.export
-            # mne.export.export_raw() 需要标准的 Raw 对象，不能是 RawArray
-            # 策略：先保存为临时 FIF 文件，再读取为标准 Raw，然后导出
-
-            import tempfile
+            # mne.export.export_raw() 可直接接受任意 BaseRaw（包括 RawArray），
+            # 无需再经临时 FIF 文件落盘、重读
 
             # 准备要导出的数据
             if export_epochs:
@@ -1916,53 +2140,25 @@ class EEGService:
                     "请运行: pip install mne-export"
                 )
 
-            # 创建临时 FIF 文件
-            with tempfile.NamedTemporaryFile(suffix='.fif', delete=False) as tmp_fif:
-                tmp_path = tmp_fif.name
+            # 映射格式名称
+            fmt_map = {
+                'edf': 'edf',
+                'set': 'eeglab'
+            }
+            fmt = fmt_map.get(format, format)
 
             try:
-                # 先保存为临时 FIF 文件（确保数据是标准 Raw 格式）
-                data_to_export.save(tmp_path, overwrite=True, verbose=False)
-
-                # 重新读取为标准 Raw 对象
-                raw_standard = mne.io.read_raw_fif(tmp_path, preload=True, verbose=False)
-
-                # 映射格式名称
-                fmt_map = {
-                    'edf': 'edf',
-                    'set': 'eeglab'
-                }
-                fmt = fmt_map.get(format, format)
-
-                # 导出为目标格式
-                try:
-                    export.export_raw(
-                        output_path,  # 第一个参数是文件路径
-                        raw_standard,  # 第二个参数是 Raw 对象
-                        fmt=fmt,
-                        overwrite=True,
-                        verbose=False
-                    )
-                except TypeError as e:
-                    # 旧版本 mne.export 可能不支持 overwrite 参数
-                    if 'overwrite' in str(e):
-                        # 先删除现有文件
-                        if os.path.exists(output_path):
-                            os.remove(output_path)
-                        export.export_raw(
-                            output_path,
-                            raw_standard,
-                            fmt=fmt,
-                            verbose=False
-                        )
-                    else:
-                        raise
-            finally:
-                # 清理临时文件
-                try:
-                    os.remove(tmp_path)
-                except OSError:
-                    pass
+                _export_raw_file(export, output_path, data_to_export, fmt)
+            except Exception:
+                # 旧版本 mne.export 对部分 Raw 子类支持不完整：
+                # 在内存中重建为 RawArray 后重试，不再经过临时 FIF 文件
+                if isinstance(data_to_export, mne.io.RawArray):
+                    raise
+                raw_standard = mne.io.RawArray(
+                    data_to_export.get_data(), data_to_export.info.copy(), verbose=False
+                )
+                raw_standard.set_annotations(data_to_export.annotations)
+                _export_raw_file(export, output_path, raw_standard, fmt)
 
         else:
             raise ValueError(f"不支持的导出格式: {format}")
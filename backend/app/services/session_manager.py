@@ -1,12 +1,27 @@
 """会话管理器 - 管理加载的 EEG 数据会话"""
+import threading
 import uuid
+import weakref
+from collections import OrderedDict, deque
+from copy import deepcopy
 from pathlib import Path
 from typing import Optional
 from datetime import datetime, timedelta
 import mne
+import numpy as np
 
 from ..config import settings
 
+
+def _snapshot(inst):
+    """复制 Raw/Epochs 的元数据，采样数据数组与原对象共享（写时复制）"""
+    data = getattr(inst, '_data', None)
+    if not isinstance(data, np.ndarray):
+        return inst.copy()
+    # 通过 memo 让 deepcopy 直接复用同一个数据数组，避免整块 memcpy
+    return deepcopy(inst, {id(data): data})
+
+
 class EEGSession:
     """单个 EEG 数据会话"""
     
@@ -18,9 +33,15 @@ class EEGSession:
         self.created_at = datetime.now()
         self.last_accessed = datetime.now()
         self.processing_history: list[dict] = []
-        # 撤销栈：保存 raw 数据的副本和epochs状态
-        self._undo_stack: list[tuple[mne.io.Raw, dict, Optional[mne.Epochs]]] = []
+        # 撤销栈：保存 raw 数据的快照和epochs状态（环形缓冲，超限时从队首淘汰最早的步骤）
+        self._undo_stack: deque[tuple[mne.io.Raw, dict, Optional[mne.Epochs]]] = deque()
         self._redo_stack: list[tuple[mne.io.Raw, dict, Optional[mne.Epochs]]] = []
+        # 当前 raw 的数据数组是否可能与撤销/重做栈中的快照共享
+        self._raw_data_shared = False
+        # TFR 单通道平均功率缓存（基线校正前，LRU），只对生成它的 epochs 对象有效
+        self._tfr_cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._tfr_cache_epochs: Optional[weakref.ref] = None
+        self._tfr_cache_lock = threading.Lock()  # TFR 任务在后台线程中读写缓存
     
     def touch(self):
         """更新最后访问时间"""
@@ -31,35 +52,88 @@ class EEGSession:
         if settings.MAX_UNDO_STACK <= 0:
             self._undo_stack.clear()
             self._redo_stack.clear()
+            self._raw_data_shared = False
             return
 
         if self.raw is not None:
-            # 复制 raw 对象
-            raw_copy = self.raw.copy()
-            # 保存epochs的副本（如果有）—避免后续原地修改导致撤销失效
-            epochs_ref = self.epochs.copy() if self.epochs is not None else None
+            # 快照 raw 对象：元数据独立，数据数组共享，原地修改前由 ensure_raw_writable 再复制
+            raw_copy = _snapshot(self.raw)
+            self._raw_data_shared = True
+            # 保存epochs的快照（如果有）—epochs 数据不会被原地修改，只需独立元数据
+            epochs_ref = _snapshot(self.epochs) if self.epochs is not None else None
             self._undo_stack.append((raw_copy, {
                 "operation": operation,
                 "params": params,
                 "timestamp": datetime.now().isoformat()
             }, epochs_ref))
-            # 限制栈大小
+            # 限制栈大小：条数与数据字节数双重上限
             if len(self._undo_stack) > settings.MAX_UNDO_STACK:
-                self._undo_stack.pop(0)
+                self._undo_stack.popleft()
+            if settings.MAX_UNDO_BYTES > 0:
+                # 最新一步始终保留，保证至少能撤销一次
+                while len(self._undo_stack) > 1 and self._undo_stack_bytes() > settings.MAX_UNDO_BYTES:
+                    self._undo_stack.popleft()
             # 清空重做栈
             self._redo_stack.clear()
     
+    def get_tfr_powers(self, epochs: mne.BaseEpochs, keys: list[tuple]) -> dict[tuple, np.ndarray]:
+        """取出 epochs 对应的 TFR 功率缓存命中项并标记为最近使用；epochs 已被替换（重新分段、撤销/重做等）时先清空
+
+        返回的数组只读，调用方需自行复制。
+        """
+        with self._tfr_cache_lock:
+            if self._tfr_cache_epochs is None or self._tfr_cache_epochs() is not epochs:
+                self._tfr_cache.clear()
+                self._tfr_cache_epochs = weakref.ref(epochs)
+            hits = {}
+            for key in keys:
+                power = self._tfr_cache.get(key)
+                if power is not None:
+                    self._tfr_cache.move_to_end(key)
+                    hits[key] = power
+            return hits
+
+    def store_tfr_power(self, epochs: mne.BaseEpochs, key: tuple, power: np.ndarray):
+        """写入一条 TFR 功率缓存，超出 TFR_CACHE_MAX_BYTES 时从最久未用的条目开始淘汰
+
+        计算期间 epochs 已被替换时丢弃该结果，避免写入新 epochs 的缓存。
+        """
+        if settings.TFR_CACHE_MAX_BYTES <= 0:
+            return
+        with self._tfr_cache_lock:
+            if self._tfr_cache_epochs is None or self._tfr_cache_epochs() is not epochs:
+                return
+            self._tfr_cache[key] = power
+            self._tfr_cache.move_to_end(key)
+            total = sum(p.nbytes for p in self._tfr_cache.values())
+            while total > settings.TFR_CACHE_MAX_BYTES and self._tfr_cache:
+                _, evicted = self._tfr_cache.popitem(last=False)
+                total -= evicted.nbytes
+
+    def _undo_stack_bytes(self) -> int:
+        """统计撤销栈额外占用的 raw/epochs 数据数组字节数
+
+        共享的数组只计一次；与当前 raw/epochs 共享（写时复制，尚未被修改）的数组不额外占用内存，不计入。
+        """
+        live = {id(getattr(inst, '_data', None)) for inst in (self.raw, self.epochs)}
+        arrays = {}
+        for raw, _, epochs in self._undo_stack:
+            for inst in (raw, epochs):
+                data = getattr(inst, '_data', None)
+                if isinstance(data, np.ndarray) and id(data) not in live:
+                    arrays[id(data)] = data.nbytes
+        return sum(arrays.values())
+
     def undo(self) -> bool:
         """撤销上一步操作"""
         if not self._undo_stack:
             return False
         
         # 保存当前状态到重做栈（包括epochs状态）
+        # 当前对象随后会被替换，直接入栈即可，无需复制
         if self.raw is not None:
             current_history = self.processing_history[-1] if self.processing_history else None
-            # 保存epochs的副本（如果有）
-            epochs_ref = self.epochs.copy() if self.epochs is not None else None
-            self._redo_stack.append((self.raw.copy(), current_history, epochs_ref))
+            self._redo_stack.append((self.raw, current_history, self.epochs))
         
         # 恢复上一个状态
         stack_item = self._undo_stack.pop()
@@ -74,6 +148,7 @@ class EEGSession:
             self.epochs = None
         
         self.raw = prev_raw
+        self._raw_data_shared = True
         
         # 移除最后一个历史记录
         if self.processing_history:
@@ -89,8 +164,7 @@ class EEGSession:
         # 保存当前状态到撤销栈（包括epochs状态）
         if self.raw is not None:
             current_history = self.processing_history[-1] if self.processing_history else None
-            epochs_ref = self.epochs.copy() if self.epochs is not None else None
-            self._undo_stack.append((self.raw.copy(), current_history, epochs_ref))
+            self._undo_stack.append((self.raw, current_history, self.epochs))
         
         # 恢复重做状态
         redo_item = self._redo_stack.pop()
@@ -104,6 +178,7 @@ class EEGSession:
             self.epochs = None
         
         self.raw = redo_raw
+        self._raw_data_shared = True
         
         # 恢复历史记录
         if redo_history:
@@ -111,6 +186,12 @@ class EEGSession:
         
         return True
     
+    def ensure_raw_writable(self):
+        """原地修改 raw 数据前调用：若数据数组仍与快照共享，先复制一份独立数组"""
+        if self._raw_data_shared and self.raw is not None and self.raw.preload:
+            self.raw._data = self.raw._data.copy()
+        self._raw_data_shared = False
+
     def can_undo(self) -> bool:
         """是否可以撤销"""
         return len(self._undo_stack) > 0
@@ -128,10 +209,17 @@ class EEGSession:
         })
 
 class SessionManager:
-    """全局会话管理器"""
+    """全局会话管理器
+
+    _strong 按最近访问顺序持有会话的强引用（最久未访问的在队首），决定会话的保留与淘汰；
+    _sessions 是按 session_id 索引的弱引用表：会话被淘汰后，只要仍有请求在使用它就还能取到，
+    请求结束后内存随即由 GC 回收。所有读写都在同一把可重入锁内完成。
+    """
     
     _instance = None
-    _sessions: dict[str, EEGSession] = {}
+    _sessions: "weakref.WeakValueDictionary[str, EEGSession]" = weakref.WeakValueDictionary()
+    _strong: "OrderedDict[str, EEGSession]" = OrderedDict()
+    _lock = threading.RLock()
     SESSION_TIMEOUT = timedelta(hours=2)  # 会话超时时间
     
     def __new__(cls):
@@ -142,44 +230,64 @@ class SessionManager:
     def create_session(self, file_path: str) -> str:
         """创建新会话"""
         session_id = str(uuid.uuid4())[:8]
-        self._sessions[session_id] = EEGSession(session_id, file_path)
+        session = EEGSession(session_id, file_path)
+        with self._lock:
+            self._strong[session_id] = session
+            self._sessions[session_id] = session
         return session_id
     
     def get_session(self, session_id: str) -> Optional[EEGSession]:
         """获取会话"""
-        session = self._sessions.get(session_id)
-        if session:
-            session.touch()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session:
+                session.touch()
+                if session_id in self._strong:
+                    self._strong.move_to_end(session_id)
         return session
     
     def remove_session(self, session_id: str):
         """移除会话"""
-        session = self._sessions.pop(session_id, None)
+        with self._lock:
+            self._strong.pop(session_id, None)
+            session = self._sessions.pop(session_id, None)
         if session:
-            try:
-                from ..config import settings
-                file_path = Path(session.file_path).resolve()
-                upload_dir = settings.UPLOAD_DIR.resolve()
-                if upload_dir in file_path.parents and file_path.exists():
-                    file_path.unlink()
-                    if file_path.suffix.lower() == ".set":
-                        file_path.with_suffix(".fdt").unlink(missing_ok=True)
-            except OSError:
-                pass
+            self._delete_uploaded_file(session)
+
+    @staticmethod
+    def _delete_uploaded_file(session: EEGSession):
+        """删除会话对应的上传缓存文件（仅限上传目录内的文件）"""
+        try:
+            file_path = Path(session.file_path).resolve()
+            upload_dir = settings.UPLOAD_DIR.resolve()
+            if upload_dir in file_path.parents and file_path.exists():
+                file_path.unlink()
+                if file_path.suffix.lower() == ".set":
+                    file_path.with_suffix(".fdt").unlink(missing_ok=True)
+        except OSError:
+            pass
     
     def cleanup_expired(self):
-        """清理过期会话"""
+        """清理过期会话：按访问顺序从队首释放强引用，遇到未过期会话即停止
+
+        仍被进行中请求引用的会话会留在弱引用表中，直到这些请求结束。
+        """
         now = datetime.now()
-        expired = [
-            sid for sid, session in self._sessions.items()
-            if now - session.last_accessed > self.SESSION_TIMEOUT
-        ]
-        for sid in expired:
-            self.remove_session(sid)
+        expired = []
+        with self._lock:
+            while self._strong:
+                session = next(iter(self._strong.values()))
+                if now - session.last_accessed <= self.SESSION_TIMEOUT:
+                    break
+                self._strong.popitem(last=False)
+                expired.append(session)
+        for session in expired:
+            self._delete_uploaded_file(session)
     
     def get_all_sessions(self) -> dict[str, EEGSession]:
         """获取所有会话"""
-        return self._sessions.copy()
+        with self._lock:
+            return dict(self._sessions)
 
 # 全局单例
 session_manager = SessionManager()
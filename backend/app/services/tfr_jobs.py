@@ -7,30 +7,163 @@
 
 from __future__ import annotations
 
-import sys
+import os
+import threading
 import uuid
 import traceback
-import io
-import base64
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional, Literal
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional, Literal
 
 import numpy as np
 import mne
 import matplotlib
 matplotlib.use('Agg')  # 非交互式后端
 import matplotlib.pyplot as plt
-
-# PyInstaller 打包环境检测
-IS_FROZEN = getattr(sys, 'frozen', False)
-
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from scipy.fft import fft, ifft, next_fast_len
+
+try:
+    import cupy as cp
+except ImportError:  # cupy 为可选依赖（需与本机 CUDA 版本匹配），未安装时只使用 CPU
+    cp = None
+
+try:
+    import pybase64 as base64
+except ImportError:  # pybase64 为可选依赖（SIMD 加速 base64 编解码，接口与标准库一致），未安装时回退到标准库
+    import base64
+
+from ..schemas import TFRResult
+from .eeg_service import _encode_figure_png
 from .session_manager import EEGSession
 from ..config import settings
 
 
 TFRStatus = Literal["pending", "running", "completed", "error"]
 
+# 每批计算的 epoch 数：批间更新进度并检查取消；epochs 较少时一次算完
+TFR_EPOCH_CHUNK = 64
+# 并行渲染 TFR 图像时每个线程任务包含的图像数（块内复用 Figure，块越小取消越及时）
+TFR_RENDER_CHUNK = 4
+
+
+def _morlet_fft_kernels(
+    sfreq: float,
+    freqs: np.ndarray,
+    n_cycles: np.ndarray,
+    n_times: int,
+) -> tuple[np.ndarray, np.ndarray, int]:
+    """构造各频率的 Morlet 小波并预先做 FFT（整个任务只算一次，各批 epochs 共用）
+
+    Returns:
+        (小波频谱 (n_freqs, n_fft) complex64, 各小波 same 模式的居中偏移 (n_freqs,), n_fft)
+    """
+    wavelets = mne.time_frequency.morlet(sfreq, freqs, n_cycles=n_cycles, zero_mean=True)
+    max_len = max(w.size for w in wavelets)
+    if max_len > n_times:
+        raise ValueError(
+            f"最低频率的小波长度（{max_len} 个采样点）超过了 Epoch 长度（{n_times} 个采样点），"
+            "请延长 Epoch 时间窗或提高 fmin"
+        )
+    n_fft = next_fast_len(n_times + max_len - 1)
+    kernels = np.empty((len(wavelets), n_fft), dtype=np.complex64)
+    for fi, wavelet in enumerate(wavelets):
+        kernels[fi] = fft(wavelet, n_fft)
+    offsets = np.array([(w.size - 1) // 2 for w in wavelets])
+    return kernels, offsets, n_fft
+
+
+def _morlet_power_sum(
+    data: np.ndarray,
+    kernels: np.ndarray,
+    offsets: np.ndarray,
+    n_fft: int,
+    decim: int,
+    workers: int,
+) -> np.ndarray:
+    """对一批 epochs 做 FFT 卷积，返回功率在 epoch 维上的 float32 累加 (n_channels, n_freqs, n_times_out)
+
+    信号频谱整批只算一次，逐频率与预计算的小波频谱相乘后逆变换，
+    按 same 模式居中截取并降采样（与 mne.time_frequency.tfr_array_morlet 一致）。
+    """
+    n_epochs, n_channels, n_times = data.shape
+    data_f = fft(data, n_fft, axis=-1, workers=workers)
+    n_times_out = len(range(0, n_times, decim))
+    power_sum = np.empty((n_channels, len(kernels), n_times_out), dtype=np.float32)
+    for fi, offset in enumerate(offsets):
+        coefs = ifft(data_f * kernels[fi], axis=-1, workers=workers)
+        coefs = coefs[..., offset:offset + n_times:decim]
+        # |coef|^2 的 epoch 求和用 einsum 乘加直接写入结果，不生成 real**2 / imag**2 等整块临时数组
+        np.einsum('ect,ect->ct', coefs.real, coefs.real, out=power_sum[:, fi])
+        power_sum[:, fi] += np.einsum('ect,ect->ct', coefs.imag, coefs.imag)
+    return power_sum
+
+
+def _cuda_available() -> bool:
+    """是否使用 CuPy 在 GPU 上计算 TFR（需开启 TFR_USE_CUDA、已安装 cupy 且检测到 CUDA 设备）"""
+    if not settings.TFR_USE_CUDA or cp is None:
+        return False
+    try:
+        return bool(cp.cuda.is_available())
+    except Exception:
+        return False
+
+
+def _morlet_power_sum_cuda(
+    data: np.ndarray,
+    kernels_gpu,  # cupy.ndarray (n_freqs, n_fft) complex64，整个任务只上传一次
+    offsets: np.ndarray,
+    n_fft: int,
+    decim: int,
+) -> np.ndarray:
+    """_morlet_power_sum 的 GPU 版本：信号上传后在显存中完成卷积与功率累加，只回传结果"""
+    n_epochs, n_channels, n_times = data.shape
+    data_f = cp.fft.fft(cp.asarray(data), n_fft, axis=-1)
+    n_times_out = len(range(0, n_times, decim))
+    power_sum = cp.empty((n_channels, len(kernels_gpu), n_times_out), dtype=cp.float32)
+    for fi, offset in enumerate(offsets):
+        coefs = cp.fft.ifft(data_f * kernels_gpu[fi], axis=-1)
+        coefs = coefs[..., offset:offset + n_times:decim]
+        power_sum[:, fi] = cp.sum(coefs.real ** 2 + coefs.imag ** 2, axis=0)
+    return cp.asnumpy(power_sum)
+
+
+def _percentile_range(
+    data: np.ndarray, vmin: Optional[float], vmax: Optional[float]
+) -> tuple[float, float]:
+    """未指定的 vmin/vmax 取数据的 2%/98% 分位数
+
+    两个分位数在一次 np.percentile 调用中求出（共用一次 O(N) 选择，不再展平复制两遍数组）。
+    """
+    if vmin is None or vmax is None:
+        low, high = np.percentile(data, [2, 98])
+        vmin = float(low) if vmin is None else vmin
+        vmax = float(high) if vmax is None else vmax
+    return vmin, vmax
+
+
+def _power_by_channel_payload(power_by_channel: np.ndarray, binary: bool, half: bool = False) -> dict:
+    """power_by_channel 的传输字段：binary 时为小端浮点 base64，否则为嵌套列表（兼容旧客户端）
+
+    half=True 时按 float16 传输（体积再减半，约 3 位有效数字，足够绘制热力图），
+    超出 float16 范围的值截断到 ±65504；只适用于基线校正后的量级（原始功率会下溢为 0）。
+    """
+    if not binary:
+        return {"power_by_channel": power_by_channel.astype(float).tolist()}
+    if half:
+        finfo = np.finfo(np.float16)
+        block = np.clip(power_by_channel, finfo.min, finfo.max).astype('<f2')
+    else:
+        block = np.ascontiguousarray(power_by_channel, dtype='<f4')
+    return {
+        "power_by_channel_b64": base64.b64encode(block).decode('ascii'),
+        "power_by_channel_shape": list(block.shape),
+        "power_by_channel_dtype": "float16" if half else "float32",
+    }
+
 
 @dataclass
 class TFRJob:
@@ -46,33 +179,60 @@ class TFRJob:
 
 class TFRJobManager:
     def __init__(self):
-        self._jobs: dict[str, TFRJob] = {}
+        # 按创建顺序保存任务；结果可能很大，创建新任务时淘汰过期或超出数量上限的旧任务
+        self._jobs: OrderedDict[str, TFRJob] = OrderedDict()
+        self._lock = threading.Lock()
 
     def create_job(self) -> str:
         job_id = str(uuid.uuid4())[:8]
         now = datetime.now()
-        self._jobs[job_id] = TFRJob(
-            job_id=job_id,
-            status="pending",
-            progress=0.0,
-            created_at=now,
-            updated_at=now,
-        )
+        with self._lock:
+            self._evict_jobs(now)
+            self._jobs[job_id] = TFRJob(
+                job_id=job_id,
+                status="pending",
+                progress=0.0,
+                created_at=now,
+                updated_at=now,
+            )
         return job_id
 
+    def _evict_jobs(self, now: datetime):
+        """淘汰结束后超过 TFR_JOB_TTL_SECONDS 未更新的任务；任务数超过 TFR_JOB_MAX 时再从最早的已结束任务开始淘汰
+
+        等待中/运行中的任务从不淘汰（单个计算批次或渲染可能超过 TTL，淘汰后轮询会得到 404）。
+        """
+        ttl = timedelta(seconds=settings.TFR_JOB_TTL_SECONDS)
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in ("completed", "error") and now - job.updated_at > ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        # 为即将创建的任务留出一个名额；运行中的任务不淘汰
+        overflow = len(self._jobs) - max(0, settings.TFR_JOB_MAX - 1)
+        if overflow > 0:
+            finished = [job_id for job_id, job in self._jobs.items() if job.status in ("completed", "error")]
+            for job_id in finished[:overflow]:
+                del self._jobs[job_id]
+
     def get_job(self, job_id: str) -> Optional[TFRJob]:
-        return self._jobs.get(job_id)
+        with self._lock:
+            return self._jobs.get(job_id)
 
     def cancel_job(self, job_id: str) -> bool:
         """取消任务"""
-        job = self._jobs.get(job_id)
-        if job and job.status in ['pending', 'running']:
-            job.cancelled = True
-            job.status = 'error'
-            job.error = '任务已被用户取消'
-            job.progress = 1.0
-            return True
-        return False
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job.status in ['pending', 'running']:
+                job.cancelled = True
+                job.status = 'error'
+                job.error = '任务已被用户取消'
+                job.progress = 1.0
+                job.updated_at = datetime.now()  # TTL 从取消时开始计算
+                return True
+            return False
 
     def _render_tfr_image(
         self,
@@ -97,10 +257,7 @@ class TFRJobManager:
 
         # 获取数据范围
         data = tfr_avg.data
-        if vmin is None:
-            vmin = float(np.percentile(data, 2))
-        if vmax is None:
-            vmax = float(np.percentile(data, 98))
+        vmin, vmax = _percentile_range(data, vmin, vmax)
         
         # 对称化颜色范围（对于 diverging colormap）
         if colormap in ['RdBu_r', 'RdBu', 'seismic', 'coolwarm']:
@@ -149,30 +306,33 @@ class TFRJobManager:
         # 调整布局
         fig.tight_layout()
         
-        # 转换为 base64
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', 
-                    facecolor='white', edgecolor='none')
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close(fig)
+        # 转换为 base64（低压缩等级 PNG）
+        try:
+            img_base64 = _encode_figure_png(fig)
+        finally:
+            plt.close(fig)
         
         return img_base64, float(vmin), float(vmax)
 
-    def _render_single_channel_tfr(
+    def _iter_tfr_images(
         self,
-        power_2d: np.ndarray,  # (n_freqs, n_times)
+        power_maps: Iterable[np.ndarray],  # 每张图 (n_freqs, n_times)
+        titles: Iterable[str],
         times_ms: np.ndarray,
         freqs: np.ndarray,
-        channel_name: str,
         colormap: str,
         vmin: float,
         vmax: float,
         baseline_mode: str,
         figsize: tuple = (8, 5),
         dpi: int = 100,
-    ) -> str:
-        """渲染单通道 TFR 图像"""
+    ) -> Iterator[str]:
+        """依次渲染一组 TFR 热力图，逐张产出 PNG 的 base64 字符串
+
+        整组只创建一个 Figure：坐标轴、0ms 标记线与 colorbar（色阶固定）只绘制一次，
+        每张图只替换图像数据与标题，再直接读取 Agg 画布编码。
+        Figure 不经过 pyplot 创建，可在多个线程中各自独立渲染。
+        """
         unit_labels = {
             'logratio': 'Power (dB)',
             'ratio': 'Power (ratio)',
@@ -181,11 +341,12 @@ class TFRJobManager:
         }
         unit_label = unit_labels.get(baseline_mode, 'Power')
 
-        fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
-        
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
         extent = [times_ms[0], times_ms[-1], freqs[0], freqs[-1]]
         im = ax.imshow(
-            power_2d,
+            np.zeros((len(freqs), len(times_ms))),
             aspect='auto',
             origin='lower',
             extent=extent,
@@ -194,31 +355,77 @@ class TFRJobManager:
             vmax=vmax,
             interpolation='bilinear',
         )
-        
+
         # 添加 0ms 标记线
         if times_ms[0] <= 0 <= times_ms[-1]:
             ax.axvline(x=0, color='black', linestyle='--', linewidth=1.5, alpha=0.7)
-        
+
         ax.set_xlabel('Time (ms)', fontsize=10)
         ax.set_ylabel('Frequency (Hz)', fontsize=10)
-        ax.set_title(channel_name, fontsize=11, fontweight='bold')
-        
+
         cbar = fig.colorbar(im, ax=ax, shrink=0.8, pad=0.02)
         cbar.set_label(unit_label, fontsize=9)
-        
+
         ax.tick_params(labelsize=8)
         cbar.ax.tick_params(labelsize=8)
-        
+
+        title = ax.set_title(' ', fontsize=11, fontweight='bold')
         fig.tight_layout()
-        
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight',
-                    facecolor='white', edgecolor='none')
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        plt.close(fig)
-        
-        return img_base64
+
+        for power_2d, channel_name in zip(power_maps, titles):
+            im.set_data(power_2d)
+            title.set_text(channel_name)
+            yield _encode_figure_png(fig)
+
+    def _iter_tfr_images_parallel(
+        self,
+        power_maps: np.ndarray,  # (n_maps, n_freqs, n_times)
+        titles: list[str],
+        times_ms: np.ndarray,
+        freqs: np.ndarray,
+        colormap: str,
+        vmin: float,
+        vmax: float,
+        baseline_mode: str,
+        figsize: tuple = (8, 5),
+        dpi: int = 100,
+        n_workers: int = 1,
+    ) -> Iterator[str]:
+        """用线程池并行渲染一组 TFR 图像，按原顺序逐张产出
+
+        每 TFR_RENDER_CHUNK 张图作为一个任务提交（块内复用同一个 Figure），按顺序等待结果；
+        生成器提前关闭（如任务取消）时丢弃尚未开始的任务，不等待正在渲染的块。
+        """
+        render_kwargs = dict(
+            times_ms=times_ms,
+            freqs=freqs,
+            colormap=colormap,
+            vmin=vmin,
+            vmax=vmax,
+            baseline_mode=baseline_mode,
+            figsize=figsize,
+            dpi=dpi,
+        )
+        if n_workers <= 1 or len(titles) <= 1:
+            yield from self._iter_tfr_images(power_maps, titles, **render_kwargs)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=n_workers)
+        try:
+            # 生成器在工作线程中才开始迭代，Figure 的创建与绘制都在该线程内完成
+            futures = [
+                executor.submit(
+                    list,
+                    self._iter_tfr_images(
+                        power_maps[lo:lo + TFR_RENDER_CHUNK], titles[lo:lo + TFR_RENDER_CHUNK], **render_kwargs
+                    ),
+                )
+                for lo in range(0, len(titles), TFR_RENDER_CHUNK)
+            ]
+            for future in futures:
+                yield from future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def run_morlet_job(
         self,
@@ -236,8 +443,10 @@ class TFRJobManager:
         colormap: str = "RdBu_r",
         vmin: Optional[float] = None,
         vmax: Optional[float] = None,
+        binary: bool = False,
+        per_channel_images: bool = True,
     ) -> None:
-        job = self._jobs.get(job_id)
+        job = self.get_job(job_id)
         if not job:
             return
 
@@ -246,6 +455,10 @@ class TFRJobManager:
             return
 
         def _update(status: Optional[TFRStatus] = None, progress: Optional[float] = None, error: Optional[str] = None, result: Optional[dict] = None):
+            # 结果在任务线程中按 TFRResult 校验并转换一次，查询接口直接序列化，不再在事件循环上逐次校验；
+            # 先写入结果再更新状态，避免轮询看到 completed 但结果尚未就绪
+            if result is not None:
+                job.result = TFRResult(**result).model_dump()
             now = datetime.now()
             job.updated_at = now
             if status is not None:
@@ -254,8 +467,6 @@ class TFRJobManager:
                 job.progress = float(progress)
             if error is not None:
                 job.error = error
-            if result is not None:
-                job.result = result
 
         try:
             _update(status="running", progress=0.05)
@@ -267,15 +478,14 @@ class TFRJobManager:
             if not channels:
                 raise ValueError("未选择通道")
 
-            # Filter epochs by event_id (if provided)
-            epochs_sel = epochs
+            # 按 event_id 选出 epoch 序号（未指定时为全部）；之后直接在数据数组上取子集，不再构造子 Epochs 对象
+            epoch_idx = np.arange(len(epochs))
             if event_id is not None:
-                mask = epochs.events[:, 2] == int(event_id)
-                if not np.any(mask):
+                epoch_idx = np.flatnonzero(epochs.events[:, 2] == int(event_id))
+                if epoch_idx.size == 0:
                     raise ValueError(f"未找到 event_id={event_id} 的 epochs")
-                epochs_sel = epochs[mask]
 
-            picks = mne.pick_channels(epochs_sel.ch_names, include=channels, ordered=True)
+            picks = mne.pick_channels(epochs.ch_names, include=channels, ordered=True)
             if len(picks) == 0:
                 raise ValueError("所选通道在 epochs 中不存在")
 
@@ -289,45 +499,85 @@ class TFRJobManager:
             decim = int(decim) if decim and int(decim) > 0 else 1
 
             # 展示型 TFR：周期数随频率增加，高频更平滑，接近离线绘图脚本的效果。
-            epoch_len = float(epochs_sel.tmax - epochs_sel.tmin)
+            epoch_len = float(epochs.tmax - epochs.tmin)
             if epoch_len <= 0:
                 raise ValueError("Epoch 时间窗无效，无法计算 TFR")
-            n_cycles_by_freq = freqs / 2.0
+            # Morlet 小波取到 ±5σ（σ = n_cycles / (2π·f)），总长约 10σ；Epoch 较短时逐频率收紧周期数，
+            # 保证小波不超过 Epoch 长度（留 10% 余量），而不是直接报错
+            n_cycles_by_freq = np.minimum(freqs / 2.0, 0.9 * 2.0 * np.pi * freqs * epoch_len / 10.0)
 
             _update(progress=0.15)
 
-            from mne.time_frequency import tfr_morlet
+            from mne.baseline import rescale
             import time
 
             # 计算前打印信息
-            n_epochs = len(epochs_sel)
+            n_epochs = len(epoch_idx)
             n_channels = len(picks)
             n_freqs = len(freqs)
-            n_times = len(epochs_sel.times)
+            n_times = len(epochs.times)
             decim = int(decim) if decim and int(decim) > 0 else 2
-            # 打包环境强制单进程，开发环境可通过 TFR_N_JOBS 调整
-            tfr_n_jobs = 1 if IS_FROZEN else max(1, int(settings.TFR_N_JOBS))
+            # FFT 卷积由 scipy.fft 线程池并行（无需多进程，打包环境同样适用）；<=0 表示使用全部核心
+            tfr_n_jobs = int(settings.TFR_N_JOBS)
+            if tfr_n_jobs <= 0:
+                tfr_n_jobs = -1
+            use_cuda = _cuda_available()
             print(
                 f"[TFR] 开始计算: epochs={n_epochs}, channels={n_channels}, freqs={n_freqs}, "
-                f"times={n_times//decim}, n_cycles=freqs/2, render_mode={render_mode}, n_jobs={tfr_n_jobs}"
+                f"times={n_times//decim}, n_cycles=min(freqs/2, 0.9·Epoch 长度可容纳)"
+                f"[{n_cycles_by_freq.min():.2f}, {n_cycles_by_freq.max():.2f}], render_mode={render_mode}, "
+                f"n_jobs={tfr_n_jobs}, device={'cuda' if use_cuda else 'cpu'}"
             )
 
             start_compute = time.time()
-            tfr_avg = tfr_morlet(
-                epochs_sel,
-                freqs=freqs,
-                n_cycles=n_cycles_by_freq,
-                return_itc=False,
-                average=True,
-                picks=picks,
-                decim=decim,
-                n_jobs=tfr_n_jobs,
-            )
-
-            _update(progress=0.65)
+            if np.any(freqs > epochs.info['sfreq'] / 2.0):
+                raise ValueError(f"fmax 不能超过奈奎斯特频率（{epochs.info['sfreq'] / 2.0:.1f} Hz）")
+            channel_names_out = [epochs.ch_names[i] for i in picks]
+            tfr_times = epochs.times[::decim]
+
+            # 基线校正前的单通道平均功率按 (event_id, 频率, decim, 通道) 缓存在会话中，
+            # 只换基线或通道子集时直接复用，只计算缓存中没有的通道
+            cache_keys = [(event_id, tuple(freqs.tolist()), decim, ch_name) for ch_name in channel_names_out]
+            cached = session.get_tfr_powers(epochs, cache_keys)
+            missing = [ci for ci, key in enumerate(cache_keys) if key not in cached]
+            power_by_channel = np.zeros((n_channels, n_freqs, len(tfr_times)), dtype=np.float32)
+            for ci, key in enumerate(cache_keys):
+                if key in cached:
+                    power_by_channel[ci] = cached[key]
+
+            if missing:
+                # 一次取出所选 epoch × 待计算通道的 float32 数据块（单次花式索引，只复制用到的数据），
+                # 直接在数组上做 Morlet 小波变换（FFT 卷积），不再构造 Epochs/AverageTFR 对象
+                data = epochs.get_data(copy=False)[np.ix_(epoch_idx, picks[missing])].astype(np.float32, copy=False)
+                kernels, offsets, n_fft = _morlet_fft_kernels(
+                    epochs.info['sfreq'], freqs, n_cycles_by_freq, n_times
+                )
+                kernels_gpu = cp.asarray(kernels) if use_cuda else None
 
+                # 按 epoch 分批累加功率到预分配的 float32 数组，批间更新进度并响应取消
+                n_chunks = max(1, int(np.ceil(n_epochs / TFR_EPOCH_CHUNK)))
+                missing_power = np.zeros((len(missing), n_freqs, len(tfr_times)), dtype=np.float32)
+                for chunk_idx, chunk in enumerate(np.array_split(data, n_chunks, axis=0)):
+                    if job.cancelled:
+                        return
+                    if use_cuda:
+                        chunk_power = _morlet_power_sum_cuda(chunk, kernels_gpu, offsets, n_fft, decim)
+                    else:
+                        chunk_power = _morlet_power_sum(chunk, kernels, offsets, n_fft, decim, tfr_n_jobs)
+                    np.add(missing_power, chunk_power, out=missing_power)
+                    _update(progress=0.15 + 0.5 * (chunk_idx + 1) / n_chunks)
+
+                missing_power /= n_epochs
+                for row, ci in enumerate(missing):
+                    power_by_channel[ci] = missing_power[row]
+                    session.store_tfr_power(epochs, cache_keys[ci], missing_power[row].copy())
+            # power_by_channel: (n_channels, n_freqs, n_times)，与缓存互不共享内存
+
+            # 基线校正只在平均功率上原地做一次
             if baseline is not None:
-                tfr_avg.apply_baseline(baseline=baseline, mode=baseline_mode)
+                power_by_channel = rescale(
+                    power_by_channel, tfr_times, baseline, mode=baseline_mode, copy=False, verbose=False
+                )
                 _update(progress=0.75)
 
             compute_time = time.time() - start_compute
@@ -335,13 +585,12 @@ class TFRJobManager:
 
             _update(progress=0.8)
 
-            power_by_channel = tfr_avg.data  # (n_channels, n_freqs, n_times)
             power = power_by_channel.mean(axis=0)  # (n_freqs, n_times) average channels
-            channel_names_out = [epochs_sel.ch_names[i] for i in picks]
 
             # 时间和频率
-            times_ms = (tfr_avg.times * 1000.0).tolist()
-            freqs_out = tfr_avg.freqs.tolist()
+            tfr_times_ms = tfr_times * 1000.0  # 渲染用数组，只换算一次
+            times_ms = tfr_times_ms.tolist()
+            freqs_out = freqs.tolist()
 
             # 根据 render_mode 决定输出
             if render_mode == "image":
@@ -350,15 +599,7 @@ class TFRJobManager:
                 
                 # 构建一个临时的 AverageTFR 对象用于渲染
                 # 计算颜色范围
-                data_flat = power_by_channel.flatten()
-                if vmin is None:
-                    actual_vmin = float(np.percentile(data_flat, 2))
-                else:
-                    actual_vmin = vmin
-                if vmax is None:
-                    actual_vmax = float(np.percentile(data_flat, 98))
-                else:
-                    actual_vmax = vmax
+                actual_vmin, actual_vmax = _percentile_range(power_by_channel, vmin, vmax)
                 
                 # 对称化颜色范围（diverging colormap）
                 if colormap in ['RdBu_r', 'RdBu', 'seismic', 'coolwarm']:
@@ -366,41 +607,51 @@ class TFRJobManager:
                     actual_vmin, actual_vmax = -abs_max, abs_max
 
                 # 渲染 ROI 平均图
-                img_base64 = self._render_single_channel_tfr(
-                    power,
-                    np.array(times_ms),
+                img_base64 = next(self._iter_tfr_images(
+                    [power],
+                    [f"ROI Average ({len(channel_names_out)} channels)"],
+                    tfr_times_ms,
                     freqs,
-                    f"ROI Average ({len(channel_names_out)} channels)",
                     colormap,
                     actual_vmin,
                     actual_vmax,
                     baseline_mode,
                     figsize=(10, 6),
                     dpi=100,
-                )
-
-                # 渲染每通道图像（多通道模式）
-                images_by_channel = {}
-                for ci, ch_name in enumerate(channel_names_out):
-                    if job.cancelled:
-                        _update(status="error", progress=1.0, error="任务已被用户取消")
-                        return
-                    ch_img = self._render_single_channel_tfr(
-                        power_by_channel[ci],
-                        np.array(times_ms),
-                        freqs,
-                        ch_name,
-                        colormap,
-                        actual_vmin,
-                        actual_vmax,
-                        baseline_mode,
+                ))
+
+                # 渲染每通道图像（多通道模式）；客户端只展示 ROI 平均图时跳过
+                images_by_channel = None
+                if per_channel_images:
+                    images_by_channel = {}
+                    # 各通道相互独立，可按 TFR_RENDER_WORKERS 用线程池并行渲染（默认 1 串行，<=0 表示按核心数，最多 8）
+                    render_workers = int(settings.TFR_RENDER_WORKERS)
+                    if render_workers <= 0:
+                        render_workers = min(8, os.cpu_count() or 1)
+                    channel_images = self._iter_tfr_images_parallel(
+                        power_by_channel,
+                        channel_names_out,
+                        times_ms=tfr_times_ms,
+                        freqs=freqs,
+                        colormap=colormap,
+                        vmin=actual_vmin,
+                        vmax=actual_vmax,
+                        baseline_mode=baseline_mode,
                         figsize=(8, 5),
                         dpi=100,
+                        n_workers=render_workers,
                     )
-                    images_by_channel[ch_name] = ch_img
-                    # 更新进度: 0.85 -> 0.98
-                    progress = 0.85 + 0.13 * ((ci + 1) / max(1, len(channel_names_out)))
-                    _update(progress=progress)
+                    try:
+                        for ci, ch_name in enumerate(channel_names_out):
+                            if job.cancelled:
+                                _update(status="error", progress=1.0, error="任务已被用户取消")
+                                return
+                            images_by_channel[ch_name] = next(channel_images)
+                            # 更新进度: 0.85 -> 0.98
+                            progress = 0.85 + 0.13 * ((ci + 1) / max(1, len(channel_names_out)))
+                            _update(progress=progress)
+                    finally:
+                        channel_images.close()
 
                 _update(
                     status="completed",
@@ -410,7 +661,7 @@ class TFRJobManager:
                         "freqs": freqs_out,
                         "power": power.astype(float).tolist(),
                         "channel_names": channel_names_out,
-                        "power_by_channel": power_by_channel.astype(float).tolist(),
+                        **_power_by_channel_payload(power_by_channel, binary, half=baseline is not None),
                         "image_base64": img_base64,
                         "images_by_channel": images_by_channel,
                         "vmin": actual_vmin,
@@ -428,7 +679,7 @@ class TFRJobManager:
                         "freqs": freqs_out,
                         "power": power.astype(float).tolist(),
                         "channel_names": channel_names_out,
-                        "power_by_channel": power_by_channel.astype(float).tolist(),
+                        **_power_by_channel_payload(power_by_channel, binary, half=baseline is not None),
                         "render_mode": "data",
                     },
                 )
@@ -1,11 +1,16 @@
 """使用真实样本 FIF 的后端集成测试。"""
 from __future__ import annotations
 
+import base64
+import json
 import os
+import struct
 import sys
 import time
 from pathlib import Path
 
+import mne
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
@@ -16,6 +21,8 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
 from app.main import app  # noqa: E402
+from app.services.eeg_service import EPOCH_SEPARATOR_VALUE  # noqa: E402
+from app.services.session_manager import session_manager  # noqa: E402
 
 
 SAMPLE_FIF_ENV = "EEG_TEST_FIF_PATH"
@@ -70,6 +77,38 @@ def loaded_session(client: TestClient) -> dict:
         client.delete(f"/api/workspace/session/{session_id}")
 
 
+@pytest.fixture()
+def memory_session() -> dict:
+    """注册一个内存 RawArray 会话（4 个 EEG 通道 + STIM 通道，每秒一个事件），不依赖样本文件。"""
+    sfreq = 500.0
+    rng = np.random.default_rng(0)
+    eeg_data = rng.standard_normal((4, int(sfreq * 10))) * 1e-5
+    stim = np.zeros((1, eeg_data.shape[1]))
+    stim[0, np.arange(1, 9) * int(sfreq)] = 1
+    info = mne.create_info(["Fz", "Cz", "Pz", "Oz", "STI 014"], sfreq, ["eeg"] * 4 + ["stim"])
+    raw = mne.io.RawArray(np.vstack([eeg_data, stim]), info, verbose=False)
+
+    session_id = session_manager.create_session("memory.fif")
+    session = session_manager.get_session(session_id)
+    session.raw = raw
+    try:
+        yield {"session_id": session_id, "session": session, "eeg_data": eeg_data}
+    finally:
+        session_manager.remove_session(session_id)
+
+
+def _expected_epoch_matrix(epochs: mne.BaseEpochs, start: int, count: int, factor: int) -> np.ndarray:
+    """按波形接口的约定拼接 epoch（µV，epoch 之间插入分隔标记值）。"""
+    picks = mne.pick_types(epochs.info, eeg=True)
+    rows = []
+    for ch in picks:
+        parts = []
+        for data in epochs.get_data()[start:start + count]:
+            parts.extend([data[ch, ::factor] * 1e6, [EPOCH_SEPARATOR_VALUE]])
+        rows.append(np.concatenate(parts[:-1]))
+    return np.asarray(rows, dtype=np.float32)
+
+
 def _pick_eeg_channels(info: dict, max_channels: int = 12) -> list[str]:
     """从数据概要中提取 EEG 通道名。"""
     eeg_channels = [
@@ -125,10 +164,106 @@ def test_workspace_load_and_waveform(loaded_session: dict, client: TestClient):
     waveform = waveform_resp.json()
 
     assert len(waveform["channels"]) > 0
+    assert waveform["dtype"] == "float32"
+    assert waveform["shape"][0] == len(waveform["channels"])
+    assert len(base64.b64decode(waveform["data_b64"])) == 4 * waveform["shape"][0] * waveform["shape"][1]
     assert waveform["sample_rate"] == 250
     assert waveform["time_range"][1] > waveform["time_range"][0]
 
 
+def test_waveform_json_raw_data_b64(memory_session: dict, client: TestClient):
+    """验证连续数据波形的 data_b64 可解码为与源数据一致的 float32 矩阵。"""
+    waveform_resp = client.post(
+        "/api/waveform/get",
+        json={
+            "session_id": memory_session["session_id"],
+            "start_time": 1,
+            "duration": 2,
+            "target_sample_rate": 250,
+        },
+    )
+    assert waveform_resp.status_code == 200, waveform_resp.text
+    waveform = waveform_resp.json()
+
+    assert waveform["is_epoch"] is False
+    assert [ch["name"] for ch in waveform["channels"]] == ["Fz", "Cz", "Pz", "Oz"]
+    assert waveform["dtype"] == "float32"
+    matrix = np.frombuffer(base64.b64decode(waveform["data_b64"]), dtype="<f4").reshape(waveform["shape"])
+
+    # 500 Hz 降到 250 Hz：步长 2；1~3 秒对应采样点 500~1500
+    expected = (memory_session["eeg_data"][:, 500:1500:2] * 1e6).astype(np.float32)
+    np.testing.assert_array_equal(matrix, expected)
+
+
+def test_waveform_json_epoch_data_b64(memory_session: dict, client: TestClient):
+    """验证分段后波形的 data_b64 按 epoch 拼接（含分隔标记）并与源数据一致。"""
+    session_id = memory_session["session_id"]
+    epochs_resp = client.post(
+        "/api/preprocessing/epochs",
+        json={
+            "session_id": session_id,
+            "event_ids": [1],
+            "tmin": -0.1,
+            "tmax": 0.3,
+            "baseline": None,
+            "reject_threshold": None,
+        },
+    )
+    assert epochs_resp.status_code == 200, epochs_resp.text
+
+    waveform_resp = client.post(
+        "/api/waveform/get",
+        json={
+            "session_id": session_id,
+            "start_time": 1,
+            "duration": 2,
+            "target_sample_rate": 250,
+        },
+    )
+    assert waveform_resp.status_code == 200, waveform_resp.text
+    waveform = waveform_resp.json()
+
+    assert waveform["is_epoch"] is True
+    assert waveform["n_epochs"] == 8
+    matrix = np.frombuffer(base64.b64decode(waveform["data_b64"]), dtype="<f4").reshape(waveform["shape"])
+
+    expected = _expected_epoch_matrix(memory_session["session"].epochs, start=1, count=2, factor=2)
+    np.testing.assert_array_equal(matrix, expected)
+
+
+def test_waveform_binary_frame(memory_session: dict, client: TestClient):
+    """验证二进制波形帧：头部与 JSON 接口一致，采样数据为与源数据一致的原始 float32。"""
+    request = {
+        "session_id": memory_session["session_id"],
+        "start_time": 1,
+        "duration": 2,
+        "target_sample_rate": 250,
+    }
+    frame_resp = client.post("/api/waveform/get-binary", json=request)
+    assert frame_resp.status_code == 200, frame_resp.text
+    assert frame_resp.headers["content-type"] == "application/octet-stream"
+
+    frame = frame_resp.content
+    (header_length,) = struct.unpack("<I", frame[:4])
+    assert (4 + header_length) % 4 == 0
+    header = json.loads(frame[4:4 + header_length])
+
+    assert "data_b64" not in header
+    assert [ch["name"] for ch in header["channels"]] == ["Fz", "Cz", "Pz", "Oz"]
+    body = frame[4 + header_length:]
+    assert len(body) == 4 * header["shape"][0] * header["shape"][1]
+    matrix = np.frombuffer(body, dtype="<f4").reshape(header["shape"])
+
+    raw = memory_session["session"].raw
+    expected = (raw.get_data(picks="eeg")[:, 500:1500:2] * 1e6).astype(np.float32)
+    np.testing.assert_array_equal(matrix, expected)
+
+    # 头部其余字段与 JSON 接口一致
+    waveform = client.post("/api/waveform/get", json=request).json()
+    waveform.pop("data_b64")
+    assert header == waveform
+
+
 def test_erp_and_topomap_visualization(loaded_session: dict, client: TestClient):
     """验证分段后 ERP 与地形图接口可正常返回。"""
     session_id = loaded_session["session_id"]
@@ -0,0 +1,162 @@
+"""会话撤销栈（写时复制快照与字节上限）的单元测试，使用内存中构造的 RawArray，无需样本文件。"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import mne
+import numpy as np
+import pytest
+
+
+# 让 pytest 在任意工作目录下都能导入 backend/app
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.config import settings  # noqa: E402
+from app.services.eeg_service import EEGService  # noqa: E402
+from app.services.session_manager import EEGSession  # noqa: E402
+
+
+# 10-20 系统电极名，可直接套用 standard_1020 定位（ICA/ICLabel 需要）
+CHANNEL_NAMES = ["Fp1", "Fp2", "F3", "F4", "C3", "C4", "P3", "P4", "O1", "O2", "Fz", "Cz", "Pz"]
+
+
+def _make_session(sfreq: float = 250.0, duration: float = 20.0) -> EEGSession:
+    """构造带随机数据的内存会话，每秒一个事件（Annotations 描述为 "1"）。"""
+    rng = np.random.default_rng(0)
+    info = mne.create_info(CHANNEL_NAMES, sfreq, "eeg")
+    data = rng.standard_normal((len(CHANNEL_NAMES), int(sfreq * duration))) * 1e-5
+    # 第 5 秒附近加入大幅伪迹，分段时该 epoch 会被剔除
+    data[0, int(5.05 * sfreq):int(5.15 * sfreq)] += 1e-3
+    raw = mne.io.RawArray(data, info, verbose=False)
+    raw.set_annotations(mne.Annotations(onset=np.arange(1.0, duration - 1.0), duration=0.0, description="1"))
+    session = EEGSession("test-session", "memory.fif")
+    session.raw = raw
+    return session
+
+
+def _state(session: EEGSession) -> tuple:
+    """复制会话当前的数据与关键元数据，用于逐位比较。"""
+    epochs_data = session.epochs.get_data().copy() if session.epochs is not None else None
+    return (
+        session.raw.get_data().copy(),
+        list(session.raw.info["bads"]),
+        session.raw.info["sfreq"],
+        epochs_data,
+    )
+
+
+def _assert_state_equal(session: EEGSession, expected: tuple):
+    """断言会话状态与之前记录的状态逐位一致。"""
+    data, bads, sfreq, epochs_data = _state(session)
+    np.testing.assert_array_equal(data, expected[0])
+    assert bads == expected[1]
+    assert sfreq == expected[2]
+    if expected[3] is None:
+        assert epochs_data is None
+    else:
+        np.testing.assert_array_equal(epochs_data, expected[3])
+
+
+def _run_round_trip(session: EEGSession, steps: list):
+    """依次执行各步骤并记录状态，再全部撤销、全部重做，逐步校验快照未被原地修改破坏。"""
+    states = [_state(session)]
+    for step in steps:
+        step()
+        states.append(_state(session))
+
+    for expected in reversed(states[:-1]):
+        assert session.undo()
+        _assert_state_equal(session, expected)
+    assert not session.can_undo()
+
+    for expected in states[1:]:
+        assert session.redo()
+        _assert_state_equal(session, expected)
+    assert not session.can_redo()
+    return states
+
+
+def test_undo_byte_budget_keeps_latest_step(monkeypatch: pytest.MonkeyPatch):
+    """数据量超过 MAX_UNDO_BYTES 时，只改元数据的步骤仍可撤销。"""
+    session = _make_session()
+    monkeypatch.setattr(settings, "MAX_UNDO_BYTES", int(0.9 * session.raw._data.nbytes))
+
+    EEGService.set_bad_channel(session, "Fp1", True)
+
+    assert session.can_undo()
+    assert session.undo()
+    assert session.raw.info["bads"] == []
+
+
+def test_undo_byte_budget_ignores_arrays_shared_with_current_data(monkeypatch: pytest.MonkeyPatch):
+    """与当前数据共享的快照数组不计入字节上限：预算 1.5 倍数据量时连续两次滤波保留两步。"""
+    session = _make_session()
+    original = session.raw.get_data()
+    monkeypatch.setattr(settings, "MAX_UNDO_BYTES", int(1.5 * session.raw._data.nbytes))
+
+    EEGService.apply_filter(session, l_freq=1.0, h_freq=None)
+    EEGService.apply_filter(session, l_freq=None, h_freq=40.0)
+    assert len(session._undo_stack) == 2
+
+    assert session.undo() and session.undo()
+    np.testing.assert_array_equal(session.raw.get_data(), original)
+
+
+def test_undo_redo_round_trip_is_bit_exact(monkeypatch: pytest.MonkeyPatch):
+    """滤波、陷波、重参考、裁剪、重采样与分段（含剔除 epoch）后撤销/重做，各步快照逐位不变。"""
+    monkeypatch.setattr(settings, "MAX_UNDO_STACK", 20)
+    session = _make_session()
+    steps = [
+        lambda: EEGService.apply_filter(session, l_freq=1.0, h_freq=40.0),
+        lambda: EEGService.apply_filter(session, notch_freq=50.0),
+        lambda: EEGService.set_bad_channel(session, "O2", True),
+        lambda: EEGService.apply_rereference(session, method="average"),
+        lambda: EEGService.crop_data(session, tmin=0.5, tmax=18.5),
+        lambda: EEGService.apply_resample(session, target_sfreq=125.0),
+        lambda: EEGService.create_epochs(
+            session, [1], tmin=-0.1, tmax=0.4, baseline=None, reject_threshold=200.0
+        ),
+    ]
+    states = _run_round_trip(session, steps)
+    assert len(session.epochs) < len(session.raw.annotations)
+
+    # 撤销到重参考之前再做一次原地修改，更早的快照必须保持不变
+    for _ in range(4):
+        session.undo()
+    EEGService.apply_filter(session, l_freq=None, h_freq=30.0)
+    assert not session.can_redo()
+    for expected in reversed(states[:4]):
+        assert session.undo()
+        _assert_state_equal(session, expected)
+
+
+def test_undo_redo_round_trip_after_ica(monkeypatch: pytest.MonkeyPatch):
+    """ICA 去伪迹（ica.apply 原地修改数据）后撤销/重做，快照逐位不变。"""
+    pytest.importorskip("mne_icalabel")
+    monkeypatch.setattr(settings, "ENABLE_ICLABEL", True)
+    session = _make_session()
+    steps = [
+        lambda: EEGService.set_montage(session, "standard_1020"),
+        lambda: EEGService.apply_filter(session, l_freq=1.0, h_freq=None),
+        lambda: EEGService.apply_ica(session, n_components=5),
+        lambda: EEGService.apply_filter(session, notch_freq=50.0),
+    ]
+    states = _run_round_trip(session, steps)
+    assert not np.array_equal(states[2][0], states[3][0])
+
+
+def test_epochs_snapshot_survives_epoch_drop():
+    """保存状态后从当前 epochs 中剔除 epoch，撤销得到的 epochs 保持原样。"""
+    session = _make_session()
+    EEGService.create_epochs(session, [1], tmin=-0.1, tmax=0.4, baseline=None, reject_threshold=None)
+    before = _state(session)
+
+    session.save_state("drop_epochs", {"indices": [0, 1]})
+    session.epochs.drop([0, 1])
+    assert len(session.epochs) == len(before[3]) - 2
+
+    assert session.undo()
+    _assert_state_equal(session, before)
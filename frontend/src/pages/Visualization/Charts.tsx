@@ -1153,6 +1153,8 @@ export function TFRChart({ onRegisterExport }: { onRegisterExport?: (fn: () => v
         // 新增：渲染模式
         renderMode: renderStyle === 'mne' ? 'image' : 'data',
         colormap: 'RdBu_r',
+        // ROI 模式只展示平均图，无需渲染每通道图像
+        perChannelImages: tfrMode === 'multi',
       });
       setJobId(res.job_id);
     } catch (e: any) {
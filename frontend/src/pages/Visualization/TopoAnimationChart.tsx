@@ -3,7 +3,7 @@ import { Loader2 } from 'lucide-react';
 import { Alert } from '../../components/ui';
 import { visualizationApi } from '../../services/api';
 import { resolveCssVar } from '../../utils/cssTheme';
-import type { TopoAnimationResponse } from '../../services/api';
+import type { TopoAnimationFrame, TopoAnimationResponse } from '../../services/api';
 // @ts-ignore - gifshot 没有类型定义
 import gifshot from 'gifshot';
 
@@ -51,24 +51,50 @@ export function TopoAnimationChart({
       return;
     }
 
+    let cancelled = false;
+    const controller = new AbortController();
+
     const fetchAnimation = async () => {
       setLoading(true);
       setError(null);
+      setAnimation(null);
+      setCurrentFrame(0);
       try {
-        const data = await visualizationApi.getTopoAnimation(
-          sessionId, startTime, endTime, frameInterval, renderMode
-        );
-        setAnimation(data);
-        setCurrentFrame(0);
+        if (renderMode === 'image') {
+          // MNE 风格：流式接收图片帧，首帧到达即可显示
+          let header: Omit<TopoAnimationResponse, 'frames'> | null = null;
+          const received: TopoAnimationFrame[] = [];
+          await visualizationApi.streamTopoAnimation(
+            sessionId, startTime, endTime, frameInterval,
+            (h) => { header = h; },
+            (frame) => {
+              received.push(frame);
+              if (cancelled || !header) return;
+              setAnimation({ ...header, frames: received.slice() });
+              setLoading(false);
+            },
+            controller.signal
+          );
+        } else {
+          const data = await visualizationApi.getTopoAnimation(
+            sessionId, startTime, endTime, frameInterval, renderMode
+          );
+          if (!cancelled) setAnimation(data);
+        }
       } catch (err: any) {
+        if (cancelled) return;
         console.error('获取动画数据失败:', err);
         setError(err.message || '获取动画数据失败');
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     fetchAnimation();
+    return () => {
+      cancelled = true;
+      controller.abort();
+    };
   }, [sessionId, startTime, endTime, frameInterval, renderMode]);
 
   // 播放逻辑
@@ -78,7 +104,8 @@ export function TopoAnimationChart({
     // 根据 playbackSpeed 调整播放速度
     const actualInterval = animation.interval_ms / playbackSpeed;
     const timer = setInterval(() => {
-      setCurrentFrame(prev => (prev >= animation.frame_count - 1) ? 0 : prev + 1);
+      // 流式接收期间只在已到达的帧内循环
+      setCurrentFrame(prev => (prev >= animation.frames.length - 1) ? 0 : prev + 1);
     }, actualInterval);
 
     return () => clearInterval(timer);
@@ -105,6 +132,10 @@ export function TopoAnimationChart({
   // 生成 GIF 的函数
   const exportGif = useCallback(async () => {
     if (!animation || animation.frames.length === 0) return;
+    if (animation.frames.length < animation.frame_count) {
+      setExportError('动画帧仍在加载中，请稍后再导出');
+      return;
+    }
 
     setExportError(null);
     setExporting(true);
@@ -265,7 +296,7 @@ export function TopoAnimationChart({
           <input
             type="range"
             min={0}
-            max={animation.frame_count - 1}
+            max={animation.frames.length - 1}
             value={currentFrame}
             onChange={(e) => {
               setCurrentFrame(parseInt(e.target.value));
@@ -309,6 +340,9 @@ export function TopoAnimationChart({
           <div>总时长: {animation.duration_ms.toFixed(0)} ms</div>
           <div>帧间隔: {animation.interval_ms.toFixed(0)} ms</div>
           <div>帧数: {animation.frame_count}</div>
+          {animation.frames.length < animation.frame_count && (
+            <div>已接收: {animation.frames.length} / {animation.frame_count} 帧</div>
+          )}
         </div>
 
         {/* 导出进度 */}
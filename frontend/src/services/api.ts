@@ -18,10 +18,10 @@ export class ApiError extends Error {
   }
 }
 
-async function request<T>(
+async function send(
   endpoint: string,
   options: RequestInit = {}
-): Promise<T> {
+): Promise<Response> {
   const url = `${API_BASE_URL}${endpoint}`;
   
   const defaultHeaders: HeadersInit = {
@@ -47,9 +47,25 @@ async function request<T>(
     throw new ApiError(errorMessage, response.status);
   }
 
+  return response;
+}
+
+async function request<T>(
+  endpoint: string,
+  options: RequestInit = {}
+): Promise<T> {
+  const response = await send(endpoint, options);
   return response.json();
 }
 
+async function requestBinary(
+  endpoint: string,
+  options: RequestInit = {}
+): Promise<ArrayBuffer> {
+  const response = await send(endpoint, options);
+  return response.arrayBuffer();
+}
+
 // ============ 类型定义 ============
 
 export interface FileInfo {
@@ -115,6 +131,17 @@ export interface WaveformData {
   n_epochs?: number;
 }
 
+// 后端原始响应：采样值以 (n_channels, n_samples) float32 矩阵的 base64 统一传输
+interface WaveformPayload extends Omit<WaveformData, 'channels'> {
+  channels: Omit<WaveformChannel, 'data'>[];
+  data_b64: string;
+  dtype: 'float32';
+  shape: [number, number];
+}
+
+// 二进制帧的 JSON 头：与 WaveformPayload 相同但不含 data_b64
+type WaveformFrameHeader = Omit<WaveformPayload, 'data_b64'>;
+
 export interface ERPData {
   times: number[];
   conditions: Record<string, { data: number[]; stderr: number[] }>;
@@ -158,6 +185,9 @@ export interface TFRResult {
   power: number[][]; // [freq][time] (channels avg)
   channel_names?: string[];
   power_by_channel?: number[][][]; // [ch][freq][time]
+  power_by_channel_b64?: string | null; // binary 模式：小端浮点数组的 base64
+  power_by_channel_shape?: [number, number, number] | null; // binary 模式：[ch, freq, time]
+  power_by_channel_dtype?: 'float16' | 'float32' | null; // binary 模式的元素类型
   // MNE 渲染模式输出
   image_base64?: string; // ROI平均图像（base64 PNG）
   images_by_channel?: Record<string, string>; // 每通道图像 {ch_name: base64}
@@ -197,6 +227,103 @@ export interface CommonPath {
   path: string;
 }
 
+// ============ 二进制数据解码 ============
+
+/**
+ * 解码后端返回的 base64 小端 float32 矩阵（行优先），返回每行的视图
+ */
+export function decodeFloat32Matrix(b64: string, shape: [number, number]): Float32Array[] {
+  const values = new Float32Array(base64ToBytes(b64).buffer);
+  const [rows, cols] = shape;
+  return Array.from({ length: rows }, (_, r) => values.subarray(r * cols, (r + 1) * cols));
+}
+
+/**
+ * 解码 base64 小端 float16 数组，逐个展开为 float32（浏览器尚未普遍支持 Float16Array）
+ */
+export function decodeFloat16Array(b64: string): Float32Array {
+  const halves = new Uint16Array(base64ToBytes(b64).buffer);
+  const values = new Float32Array(halves.length);
+  for (let i = 0; i < halves.length; i++) {
+    const h = halves[i];
+    const sign = h & 0x8000 ? -1 : 1;
+    const exponent = (h >> 10) & 0x1f;
+    const fraction = h & 0x3ff;
+    if (exponent === 0) {
+      values[i] = sign * fraction * 2 ** -24; // 非规格化数
+    } else if (exponent === 0x1f) {
+      values[i] = fraction ? NaN : sign * Infinity;
+    } else {
+      values[i] = sign * (1 + fraction / 1024) * 2 ** (exponent - 15);
+    }
+  }
+  return values;
+}
+
+function base64ToBytes(b64: string): Uint8Array {
+  const binary = atob(b64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+}
+
+/**
+ * 解析 /waveform/get-binary 返回的二进制帧：
+ * 4 字节小端 uint32 头长度 + UTF-8 JSON 头 + 4 字节对齐的小端 float32 矩阵
+ */
+export function parseWaveformFrame(buffer: ArrayBuffer): { header: WaveformFrameHeader; rows: Float32Array[] } {
+  const headerLength = new DataView(buffer).getUint32(0, true);
+  const header: WaveformFrameHeader = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength))
+  );
+  const [rows, cols] = header.shape;
+  const values = new Float32Array(buffer, 4 + headerLength, rows * cols);
+  return {
+    header,
+    rows: Array.from({ length: rows }, (_, r) => values.subarray(r * cols, (r + 1) * cols)),
+  };
+}
+
+/**
+ * 将 binary 模式的 power_by_channel（float16/float32 base64）还原为 [ch][freq][time]
+ */
+function toTFRResult(payload: TFRResult): TFRResult {
+  const {
+    power_by_channel_b64: b64,
+    power_by_channel_shape: shape,
+    power_by_channel_dtype: dtype,
+    ...rest
+  } = payload;
+  if (!b64 || !shape) return payload;
+  const [nChannels, nFreqs, nTimes] = shape;
+  let rows: Float32Array[];
+  if (dtype === 'float16') {
+    const values = decodeFloat16Array(b64);
+    rows = Array.from({ length: nChannels * nFreqs }, (_, r) => values.subarray(r * nTimes, (r + 1) * nTimes));
+  } else {
+    rows = decodeFloat32Matrix(b64, [nChannels * nFreqs, nTimes]);
+  }
+  return {
+    ...rest,
+    power_by_channel: Array.from({ length: nChannels }, (_, c) =>
+      rows.slice(c * nFreqs, (c + 1) * nFreqs).map((row) => Array.from(row))
+    ),
+  };
+}
+
+function toWaveformData(payload: WaveformFrameHeader, rows: Float32Array[]): WaveformData {
+  return {
+    time_range: payload.time_range,
+    sample_rate: payload.sample_rate,
+    channels: payload.channels.map((ch, i) => ({ ...ch, data: Array.from(rows[i]) })),
+    events: payload.events,
+    is_epoch: payload.is_epoch,
+    n_epochs: payload.n_epochs,
+  };
+}
+
 // ============ 文件系统 API ============
 
 export const filesystemApi = {
@@ -344,7 +471,7 @@ export const waveformApi = {
     duration: number = 10,
     targetSampleRate: number = 250
   ): Promise<WaveformData> {
-    return request('/waveform/get', {
+    const buffer = await requestBinary('/waveform/get-binary', {
       method: 'POST',
       body: JSON.stringify({
         session_id: sessionId,
@@ -353,6 +480,8 @@ export const waveformApi = {
         target_sample_rate: targetSampleRate,
       }),
     });
+    const { header, rows } = parseWaveformFrame(buffer);
+    return toWaveformData(header, rows);
   },
 };
 
@@ -636,6 +765,7 @@ export const visualizationApi = {
     colormap?: string;
     vmin?: number;
     vmax?: number;
+    perChannelImages?: boolean; // image 模式下是否渲染每通道图像（默认 true）
   }): Promise<TFRStartResponse> {
     return request('/visualization/tfr/start', {
       method: 'POST',
@@ -652,6 +782,8 @@ export const visualizationApi = {
         colormap: params.colormap || 'RdBu_r',
         vmin: params.vmin,
         vmax: params.vmax,
+        binary: true,
+        per_channel_images: params.perChannelImages ?? true,
       }),
     });
   },
@@ -684,13 +816,78 @@ export const visualizationApi = {
     });
   },
 
+  /**
+   * 流式获取 MNE 风格地形图动画帧（NDJSON：首行为动画元数据，其后每行一帧）
+   * 每解析出一帧即回调 onFrame，前端可边接收边显示
+   */
+  async streamTopoAnimation(
+    sessionId: string,
+    startTime: number,
+    endTime: number,
+    frameInterval: number,
+    onHeader: (header: Omit<TopoAnimationResponse, 'frames'>) => void,
+    onFrame: (frame: TopoAnimationFrame) => void,
+    signal?: AbortSignal,
+    contours: number = 8,
+    sensors: boolean = true
+  ): Promise<void> {
+    const response = await send('/visualization/topomap/animation/stream', {
+      method: 'POST',
+      signal,
+      body: JSON.stringify({
+        session_id: sessionId,
+        start_time: startTime,
+        end_time: endTime,
+        frame_interval: frameInterval,
+        render_mode: 'image',
+        contours,
+        sensors,
+      }),
+    });
+    if (!response.body) {
+      throw new Error('当前浏览器不支持流式响应');
+    }
+
+    let headerReceived = false;
+    const handleLine = (line: string) => {
+      if (!line.trim()) return;
+      const item = JSON.parse(line);
+      if (item.error) {
+        throw new Error(item.error);
+      }
+      if (!headerReceived) {
+        headerReceived = true;
+        onHeader(item);
+      } else {
+        onFrame(item);
+      }
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let pending = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      pending += decoder.decode(value, { stream: true });
+      let newline = pending.indexOf('\n');
+      while (newline >= 0) {
+        handleLine(pending.slice(0, newline));
+        pending = pending.slice(newline + 1);
+        newline = pending.indexOf('\n');
+      }
+    }
+    handleLine(pending + decoder.decode());
+  },
+
   /**
    * 查询 TFR 任务状态/结果
    */
   async getTFRJob(jobId: string): Promise<TFRJobResponse> {
-    return request(`/visualization/tfr/${jobId}`, {
+    const job = await request<TFRJobResponse>(`/visualization/tfr/${jobId}`, {
       method: 'GET',
     });
+    return job.result ? { ...job, result: toTFRResult(job.result) } : job;
   },
 
   /**